@@ -0,0 +1,270 @@
+# benchmarks/bench_pipeline.py
+"""Time every stage of the violation pipeline on synthetic traffic, offline.
+
+    python benchmarks/bench_pipeline.py --vehicles 10 50 --resolutions 800x450 1920x1080 \\
+        --json benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json
+
+Each scenario renders a video of boxes driving down the frame across the
+stop line, then runs it through CameraProcessor exactly as main.py does,
+with a stub detector that returns the ground-truth boxes. No YOLO weights
+or network are needed, and the same seed always gives the same video and
+detections, so two runs differ only in how fast the code is.
+
+Stages: decode, detect, track, speed, one per rule (redlight, overspeed),
+db_log (queueing a row), db_commit (one batch to SQLite) and snapshot
+(encoding one evidence JPEG). With --compare, any stage whose mean time
+grew by more than --tolerance over the baseline is reported and the exit
+status is 1.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from config import make_camera  # noqa: E402
+from database import ViolationWriter, init_db  # noqa: E402
+from detection import detect_batch, vehicle_class_ids  # noqa: E402
+from main import CameraProcessor  # noqa: E402
+from models import get_overspeed_model  # noqa: E402
+
+CAR = 2   # COCO class id the stub reports every box as
+STAGES = ("decode", "detect", "track", "speed", "redlight", "overspeed", "wronglane",
+          "db_log", "db_commit", "snapshot")   # report order
+
+# --- Synthetic traffic ---
+def synthetic_traffic(n_vehicles, frame_size, n_frames, speeds=(4.0, 12.0), seed=0):
+    """Ground-truth (N, 6) boxes per frame for vehicles driving down the frame in lanes.
+
+    Each vehicle keeps its own speed (px/frame, drawn from `speeds`) and
+    re-enters at the top after leaving at the bottom.
+    """
+    rng = np.random.default_rng(seed)
+    w, h = frame_size
+    bw, bh = max(8, w // 40), max(12, h // 12)
+    lanes = max(1, (w - bw) // (bw * 2))
+    lane_x = np.linspace(bw, w - 2 * bw, lanes)
+    x = lane_x[np.arange(n_vehicles) % lanes]
+    y0 = rng.uniform(-bh, h, n_vehicles)
+    v = rng.uniform(*speeds, n_vehicles)
+    span = h + 2 * bh
+    frames = []
+    for t in range(n_frames):
+        y = (y0 + v * t + bh) % span - bh
+        boxes = np.stack([x, y, x + bw, y + bh, np.full(n_vehicles, 0.9),
+                          np.full(n_vehicles, CAR)], axis=1)
+        visible = (boxes[:, 3] > 0) & (boxes[:, 1] < h)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, h)
+        frames.append(boxes[visible].round().astype(np.float32))
+    return frames
+
+def render_video(path, truth, frame_size, fps):
+    """Write the ground truth as coloured boxes on a grey road."""
+    w, h = frame_size
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    background = np.full((h, w, 3), 90, dtype=np.uint8)
+    for boxes in truth:
+        frame = background.copy()
+        for i, (x1, y1, x2, y2) in enumerate(boxes[:, :4].astype(int)):
+            color = (40 + 53 * i % 200, 80 + 97 * i % 170, 200 - 31 * i % 150)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        out.write(frame)
+    out.release()
+
+class StubDetector:
+    """Deterministic detector: returns the next frames' ground truth, in order."""
+
+    names = {CAR: "car"}
+
+    def __init__(self, truth):
+        self.truth = truth
+        self.cursor = 0
+
+    def detect(self, frames):
+        out = self.truth[self.cursor:self.cursor + len(frames)]
+        self.cursor += len(frames)
+        return out
+
+# --- Stage timing ---
+class StageTimes:
+    """Per-stage wall-clock samples, safe to record from worker threads."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        result = {}
+        order = sorted(self.samples, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s))
+        for stage in order:
+            ms = np.array(self.samples[stage]) * 1000
+            result[stage] = {"calls": len(ms), "total_ms": float(ms.sum()),
+                             "mean_ms": float(ms.mean()),
+                             "p50_ms": float(np.percentile(ms, 50)),
+                             "p95_ms": float(np.percentile(ms, 95))}
+        return result
+
+def run_scenario(n_vehicles, frame_size, n_frames, fps, speeds, batch_size, seed):
+    truth = synthetic_traffic(n_vehicles, frame_size, n_frames, speeds, seed)
+    w, h = frame_size
+    camera = make_camera(name="bench", frame_size=[w, h], stop_line_y=int(h * 2 / 3))
+    times = StageTimes()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        video = os.path.join(workdir, "traffic.mp4")
+        render_video(video, truth, frame_size, fps)
+        cwd = os.getcwd()
+        os.chdir(workdir)   # logs/ (snapshots and the DB) go to the scratch directory
+        try:
+            init_db()
+            writer = ViolationWriter(os.path.join("logs", "violations.db"))
+            writer.commit = times.wrap("db_commit", writer.commit)
+            processor = CameraProcessor(camera, fps, log=times.wrap("db_log", writer.log),
+                                        verbose=False)
+            processor.tracker.update = times.wrap("track", processor.tracker.update)
+            processor.speed_estimator.update = times.wrap("speed", processor.speed_estimator.update)
+            processor.snapshots.write = times.wrap("snapshot", processor.snapshots.write)
+            for rule in processor.rules:
+                rule.check = times.wrap(rule.slug, rule.check)
+
+            stub = StubDetector(truth)
+            class_ids = vehicle_class_ids(stub)
+            detect = times.wrap("detect", lambda frames: detect_batch(stub, frames, class_ids))
+
+            cap = cv2.VideoCapture(video)
+            start = time.perf_counter()
+            frame_idx = 0
+            while True:
+                batch = []
+                for _ in range(batch_size):
+                    t0 = time.perf_counter()
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frame = cv2.resize(frame, tuple(camera["frame_size"]))
+                    times.add("decode", time.perf_counter() - t0)
+                    batch.append(frame)
+                if not batch:
+                    break
+                processor.process_batch(batch, range(frame_idx, frame_idx + len(batch)), detect)
+                frame_idx += len(batch)
+            cap.release()
+            processor.close()
+            writer.close()
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "vehicles": n_vehicles,
+        "resolution": f"{w}x{h}",
+        "frames": frame_idx,
+        "violations": writer.written,
+        "tracks": processor.tracker.object_id,
+        "fps": frame_idx / max(elapsed, 1e-9),
+        "stages": times.summary(),
+    }
+
+# --- Baseline comparison ---
+def scenario_key(result):
+    return f"{result['vehicles']}@{result['resolution']}"
+
+def compare(results, baseline, tolerance):
+    """(scenario, what, old, new) for every stage slower than baseline * (1 + tolerance).
+
+    The input is deterministic, so a different number of tracks or
+    violations than the baseline is reported too: tracking or rules changed.
+    """
+    old = {scenario_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = old.get(scenario_key(result))
+        if before is None:
+            continue
+        for what in ("tracks", "violations"):
+            if what in before and result[what] != before[what]:
+                regressions.append((scenario_key(result), what, before[what], result[what]))
+        for stage, stats in result["stages"].items():
+            if stage not in before["stages"]:
+                continue
+            was = before["stages"][stage]["mean_ms"]
+            if stats["mean_ms"] > was * (1 + tolerance):
+                regressions.append((scenario_key(result), stage, was, stats["mean_ms"]))
+    return regressions
+
+def parse_resolution(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--resolutions", nargs="+", default=["800x450"],
+                        help="WIDTHxHEIGHT of the synthetic video")
+    parser.add_argument("--speeds", type=float, nargs=2, default=[4.0, 12.0],
+                        metavar=("MIN", "MAX"), help="vehicle speeds in px/frame")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="write the results here (e.g. a new baseline)")
+    parser.add_argument("--compare", default=None, help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown per stage before it counts as a regression")
+    args = parser.parse_args()
+
+    get_overspeed_model()   # load from the repo-relative path before scenarios chdir away
+    results = []
+    for n, res in itertools.product(args.vehicles, args.resolutions):
+        result = run_scenario(n, parse_resolution(res), args.frames, args.fps, args.speeds,
+                              args.batch_size, args.seed)
+        results.append(result)
+        print(f"\n🚗 {n} vehicles @ {result['resolution']}: {result['frames']} frames, "
+              f"{result['fps']:.1f} FPS end to end, {result['tracks']} tracks, "
+              f"{result['violations']} violations")
+        print(f"   {'stage':<12} {'calls':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'total ms':>10}")
+        for stage, s in result["stages"].items():
+            print(f"   {stage:<12} {s['calls']:>7} {s['mean_ms']:9.3f} {s['p50_ms']:9.3f} "
+                  f"{s['p95_ms']:9.3f} {s['total_ms']:10.1f}")
+
+    report = {"config": vars(args), "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Wrote {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.compare} "
+                  f"(stages slower by more than {args.tolerance:.0%} or changed counts):")
+            for key, what, was, now in regressions:
+                unit = "" if what in ("tracks", "violations") else " ms"
+                print(f"   {key:<16} {what:<12} {was:8.3f} → {now:8.3f}{unit}")
+            sys.exit(1)
+        print(f"\n✅ No stage regressed more than {args.tolerance:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_tracker.py
+"""Time CentroidTracker.update() against the old nested-loop tracker as the
+number of vehicles per frame grows.
+
+    python benchmarks/bench_tracker.py --counts 10 50 100 200 500 --frames 200
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from tracking import CentroidTracker, get_center  # noqa: E402
+
+def synthetic_frames(n_objects, n_frames, width=1920, height=1080, seed=0):
+    """Boxes moving at constant velocity on a grid, so neighbours stay > 35 px apart."""
+    rng = np.random.default_rng(seed)
+    cols = int(math.ceil(math.sqrt(n_objects * width / height)))
+    rows = int(math.ceil(n_objects / cols))
+    gx, gy = np.meshgrid(np.linspace(40, width - 40, cols), np.linspace(40, height - 40, rows))
+    start = np.stack([gx.ravel(), gy.ravel()], axis=1)[:n_objects]
+    velocity = rng.uniform(-3, 3, size=(n_objects, 2))
+    for i in range(n_frames):
+        centers = start + velocity * i
+        yield np.concatenate([centers - 15, centers + 15], axis=1)
+
+def legacy_update(state, detections):
+    """The original first-match-within-35-px loop, kept here as the reference."""
+    current_objects = {}
+    for (x1, y1, x2, y2) in detections:
+        cx, cy = get_center(x1, y1, x2, y2)
+        same_object_detected = False
+        for id, pt in state["tracked_objects"].items():
+            if math.hypot(cx - pt[0], cy - pt[1]) < 35:
+                current_objects[id] = (cx, cy)
+                same_object_detected = True
+                break
+        if not same_object_detected:
+            state["object_id"] += 1
+            current_objects[state["object_id"]] = (cx, cy)
+    state["tracked_objects"] = current_objects
+    return current_objects
+
+def time_tracker(update, frames):
+    start = time.perf_counter()
+    for dets in frames:
+        update(dets)
+    return (time.perf_counter() - start) / len(frames)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100, 200, 500])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    # The tracker imports the solver lazily; pay for that here, not in the first timed scenario
+    from scipy.optimize import linear_sum_assignment
+    linear_sum_assignment(np.ones((2, 2)))
+
+    print(f"{'objects':>8} | {'vectorized ms/frame':>20} | {'legacy ms/frame':>16} | {'IDs (vec/legacy)':>17}")
+    for n in args.counts:
+        frames = list(synthetic_frames(n, args.frames))
+        legacy_frames = [d.astype(int).tolist() for d in frames]
+
+        tracker = CentroidTracker()
+        vec = time_tracker(tracker.update, frames)
+
+        state = {"tracked_objects": {}, "object_id": 0}
+        legacy = time_tracker(lambda d: legacy_update(state, d), legacy_frames)
+
+        print(f"{n:>8} | {vec * 1000:>20.3f} | {legacy * 1000:>16.3f} | "
+              f"{tracker.object_id:>8}/{state['object_id']:<8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/compare_backends.py
+"""Compare detector backends on our own clips: latency, throughput and accuracy drift.
+
+    python src/onnx_backend.py --model yolov8n.pt --int8
+    python benchmarks/compare_backends.py --baseline yolov8n.pt \\
+        --candidates yolov8n.onnx yolov8n.int8.onnx --videos data/sample_video.mp4
+
+There are no hand labels, so drift is measured against the baseline: its
+vehicle detections are the reference, and each candidate gets mAP@0.5 and
+mAP@0.5:0.95 (COCO-style, 101-point) against them. 1.0 means identical boxes.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from detection import vehicle_class_ids, detect_batch  # noqa: E402
+from models import load_yolo, warm_up  # noqa: E402
+from onnx_backend import sample_frames  # noqa: E402
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+def average_precision(preds, refs, iou_threshold):
+    """AP of per-frame predictions against per-frame references (both (N, 6), one class)."""
+    scores, hits, n_ref = [], [], 0
+    for p, r in zip(preds, refs):
+        n_ref += len(r)
+        p = p[np.argsort(-p[:, 4])]
+        ious = box_iou(p[:, :4], r[:, :4]) if len(p) and len(r) else np.zeros((len(p), len(r)))
+        used = np.zeros(len(r), dtype=bool)
+        for i in range(len(p)):
+            scores.append(p[i, 4])
+            candidates = np.where(used, -1.0, ious[i]) if len(r) else np.zeros(0)
+            j = int(candidates.argmax()) if len(candidates) else -1
+            hit = j >= 0 and candidates[j] >= iou_threshold
+            if hit:
+                used[j] = True
+            hits.append(hit)
+    if n_ref == 0:
+        return float("nan")
+    if not scores:
+        return 0.0
+    hits = np.array(hits)[np.argsort(-np.array(scores))]
+    tp = np.cumsum(hits)
+    precision = tp / np.arange(1, len(tp) + 1)
+    recall = tp / n_ref
+    envelope = np.maximum.accumulate(precision[::-1])[::-1]
+    idx = np.searchsorted(recall, np.linspace(0, 1, 101), side="left")
+    return float(np.where(idx < len(envelope), envelope[np.minimum(idx, len(envelope) - 1)], 0.0).mean())
+
+def drift(preds, refs):
+    """(mAP@0.5, mAP@0.5:0.95) of a candidate's detections against the baseline's."""
+    classes = np.unique(np.concatenate([r[:, 5] for r in refs])) if refs else []
+    per_threshold = []
+    for t in IOU_THRESHOLDS:
+        aps = [average_precision([p[p[:, 5] == c] for p in preds],
+                                 [r[r[:, 5] == c] for r in refs], t) for c in classes]
+        aps = [ap for ap in aps if not np.isnan(ap)]
+        per_threshold.append(np.mean(aps) if aps else float("nan"))
+    return float(per_threshold[0]), float(np.mean(per_threshold))
+
+def benchmark(path, frames, batch_size, threads):
+    """Detections plus latency (batch 1) and throughput (batch_size) for one model."""
+    model = load_yolo(path, threads)
+    class_ids = vehicle_class_ids(model)
+    warm_up(model, frames[0].shape[1::-1], runs=3)
+
+    latencies, detections = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.extend(detect_batch(model, [frame], class_ids))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        detect_batch(model, frames[i:i + batch_size], class_ids)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    return detections, {
+        "model": path,
+        "size_mb": os.path.getsize(path) / 1e6 if os.path.exists(path) else None,
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "throughput_fps": len(frames) / max(elapsed, 1e-9),
+        "boxes": int(sum(len(d) for d in detections)),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare detector backends")
+    parser.add_argument("--baseline", default="yolov8n.pt")
+    parser.add_argument("--candidates", nargs="+", default=["yolov8n.onnx"])
+    parser.add_argument("--videos", nargs="+", default=["data/sample_video.mp4"])
+    parser.add_argument("--frames", type=int, default=100, help="frames sampled per video")
+    parser.add_argument("--batch-size", type=int, default=8, help="batch size for throughput")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime threads")
+    parser.add_argument("--json", default=None, help="also write the results here")
+    args = parser.parse_args()
+
+    frames = [f for video in args.videos for f in sample_frames(video, args.frames)]
+    print(f"🎞️  {len(frames)} frames from {len(args.videos)} clip(s)")
+
+    reference, base = benchmark(args.baseline, frames, args.batch_size, args.threads)
+    base.update(map50=1.0, map50_95=1.0)
+    results = [base]
+    for path in args.candidates:
+        detections, row = benchmark(path, frames, args.batch_size, args.threads)
+        row["map50"], row["map50_95"] = drift(detections, reference)
+        results.append(row)
+
+    print(f"{'model':<28} {'MB':>6} {'p50 ms':>8} {'p95 ms':>8} {'FPS':>8} {'boxes':>7} "
+          f"{'mAP50':>7} {'mAP50-95':>9}")
+    for r in results:
+        size = f"{r['size_mb']:.1f}" if r["size_mb"] is not None else "-"
+        print(f"{os.path.basename(r['model']):<28} {size:>6} {r['latency_ms_p50']:8.2f} "
+              f"{r['latency_ms_p95']:8.2f} {r['throughput_fps']:8.1f} {r['boxes']:>7} "
+              f"{r['map50']:7.3f} {r['map50_95']:9.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"frames": len(frames), "results": results}, f, indent=2)
+        print(f"💾 Wrote {args.json}")
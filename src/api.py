@@ -0,0 +1,213 @@
+# src/api.py
+"""HTTP query service over the violations store.
+
+    uvicorn api:app --app-dir src --port 8000
+    curl "localhost:8000/violations?type=Red%20Light&since=2026-10-01&limit=100"
+    curl "localhost:8000/violations?before_id=48213"        # next page
+    curl "localhost:8000/stats/counts?by=day&camera=cam0"
+    curl -N "localhost:8000/violations/stream?after_id=48213"
+
+Reads go through a small pool of read-only connections (see queries.py),
+run on worker threads so the event loop never blocks on SQLite, and never
+take a lock the detection pipeline's writer would wait for. Listings page
+by id. Aggregates are cached for a few seconds and computed once however
+many clients ask at the same time. The stream is fed by one poller that
+fans new rows out to every subscriber.
+"""
+import argparse
+import asyncio
+import json
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from database import DB_PATH
+from queries import GROUPS, ReadPool, count_by, list_violations, max_id, rows_after
+
+AGGREGATE_TTL = 5.0    # seconds an aggregate answer is reused
+POLL_INTERVAL = 1.0    # seconds between checks for new violations (stream)
+MAX_PAGE = 1000        # largest page a client may ask for
+BACKLOG_LIMIT = 1000   # rows per query when replaying a stream from after_id
+
+class TTLCache:
+    """Async cache whose concurrent misses for one key share a single computation."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}   # key -> (expires, future)
+
+    async def get(self, key, compute):
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        failed = entry is not None and entry[1].done() and (entry[1].cancelled() or entry[1].exception())
+        if entry is None or entry[0] < now or failed:
+            future = asyncio.ensure_future(compute())
+            self.entries[key] = entry = (now + self.ttl, future)
+            # Forget expired keys now and then so the dict stays small
+            if len(self.entries) > 1000:
+                self.entries = {k: e for k, e in self.entries.items() if e[0] >= now}
+        return await asyncio.shield(entry[1])
+
+class ViolationFeed:
+    """One background poller that pushes each new violation to every subscriber."""
+
+    def __init__(self, pool, interval=POLL_INTERVAL, queue_size=1000):
+        self.pool = pool
+        self.interval = interval
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.last_id = None
+
+    def subscribe(self):
+        q = asyncio.Queue(self.queue_size)
+        self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.subscribers.discard(q)
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+            except sqlite3.Error as e:   # e.g. no database yet; try again
+                print(f"❌ Violation feed poll failed: {e}")
+            except Exception as e:   # one bad poll must not end the feed for every client
+                print(f"❌ Violation feed error: {e!r}")
+            await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        if self.last_id is None:
+            self.last_id = await asyncio.to_thread(self.pool.call, max_id)
+        rows = await asyncio.to_thread(self.pool.call, rows_after, self.last_id)
+        for row in rows:
+            self.last_id = row["id"]
+            for q in list(self.subscribers):
+                if q.full():
+                    # A client this far behind gets dropped rather than stall the feed;
+                    # make room so it can still be told (None) that it was dropped
+                    self.unsubscribe(q)
+                    q.get_nowait()
+                    q.put_nowait(None)
+                else:
+                    q.put_nowait(row)
+
+def db_time(value):
+    """ISO date/datetime from a query string → the DB's timestamp format."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise HTTPException(422, f"Not an ISO date/time: {value!r}")
+
+def create_app(db_path=DB_PATH, pool_size=4):
+    pool = ReadPool(db_path, pool_size)
+    feed = ViolationFeed(pool)
+    aggregates = TTLCache(AGGREGATE_TTL)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        task = asyncio.create_task(feed.run())
+        yield
+        task.cancel()
+        pool.close()
+
+    app = FastAPI(title="Traffic violation query service", lifespan=lifespan)
+
+    async def query(fn, *args, **kwargs):
+        return await asyncio.to_thread(pool.call, fn, *args, **kwargs)
+
+    def filters(violation_type, camera, vehicle_id, since, until):
+        return {"violation_type": violation_type, "camera": camera, "vehicle_id": vehicle_id,
+                "since": db_time(since), "until": db_time(until)}
+
+    @app.get("/violations")
+    async def violations(violation_type: str = Query(None, alias="type"), camera: str = None,
+                         vehicle_id: int = None, since: str = None, until: str = None,
+                         before_id: int = None, limit: int = Query(50, ge=1, le=MAX_PAGE)):
+        """Newest first; pass next_before_id back as before_id for the next page."""
+        rows, cursor = await query(list_violations, limit, before_id,
+                                   **filters(violation_type, camera, vehicle_id, since, until))
+        return {"items": rows, "next_before_id": cursor}
+
+    @app.get("/stats/counts")
+    async def counts(by: str = "type", violation_type: str = Query(None, alias="type"),
+                     camera: str = None, vehicle_id: int = None, since: str = None,
+                     until: str = None):
+        if by not in GROUPS:
+            raise HTTPException(422, f"by must be one of {sorted(GROUPS)}")
+        where = filters(violation_type, camera, vehicle_id, since, until)
+        key = ("counts", by, tuple(sorted(where.items())))
+        rows = await aggregates.get(key, lambda: query(count_by, by, **where))
+        return {"by": by, "counts": [{"group": g, "count": n} for g, n in rows]}
+
+    @app.get("/stats/summary")
+    async def summary():
+        async def compute():
+            by_type, by_camera, latest = await asyncio.gather(
+                query(count_by, "type"), query(count_by, "camera"), query(max_id))
+            return {"total": sum(n for _, n in by_type), "latest_id": latest,
+                    "by_type": dict(by_type), "by_camera": {str(c): n for c, n in by_camera}}
+        return await aggregates.get(("summary",), compute)
+
+    @app.get("/violations/stream")
+    async def stream(request: Request, after_id: int = None,
+                     violation_type: str = Query(None, alias="type"), camera: str = None):
+        """Server-sent events: one `violation` event per new row (replaying from after_id)."""
+        if after_id is None and request.headers.get("last-event-id", "").isdigit():
+            after_id = int(request.headers["last-event-id"])   # a reconnecting EventSource
+        q = feed.subscribe()
+
+        def matches(row):
+            return ((violation_type is None or row["type"] == violation_type)
+                    and (camera is None or row["camera"] == camera))
+
+        def event(row):
+            return f"id: {row['id']}\nevent: violation\ndata: {json.dumps(row)}\n\n"
+
+        async def events():
+            last = after_id
+            try:
+                # Replay what the client missed, a bounded chunk at a time; rows
+                # the feed also delivers meanwhile are skipped by id below
+                while last is not None:
+                    backlog = await query(rows_after, last, BACKLOG_LIMIT,
+                                          violation_type=violation_type, camera=camera)
+                    for row in backlog:
+                        last = row["id"]
+                        yield event(row)
+                    if len(backlog) < BACKLOG_LIMIT:
+                        break
+                while not await request.is_disconnected():
+                    try:
+                        row = await asyncio.wait_for(q.get(), timeout=15)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    if row is None:
+                        yield "event: overflow\ndata: {}\n\n"
+                        return
+                    if (last is None or row["id"] > last) and matches(row):
+                        last = row["id"]
+                        yield event(row)
+            finally:
+                feed.unsubscribe(q)
+
+        return StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Violation query service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,214 @@
+# src/chunked.py
+"""Process one long recorded video in parallel time segments.
+
+    python src/chunked.py --video data/overnight.mp4 --workers 8 --overlap 2.0
+
+The file is cut into one segment per worker process. Each worker seeks to
+`overlap` seconds before its segment and runs that stretch only to warm up
+its tracker, speed windows and rule memory. Violations there belong to the
+previous segment and are not logged again. Track IDs are stitched at every
+boundary: the frame just before a segment starts is seen by both workers,
+so its tracks are matched by position and the new segment's IDs continue
+the old ones. The parent then logs every segment's violations in order
+through the one DB writer, skipping any vehicle already logged for the
+same rule in an earlier segment (and deleting the evidence files saved for
+that repeat, which no row would point to).
+"""
+import multiprocessing as mp
+import os
+import time
+import cv2
+import numpy as np
+from config import is_live_source, open_source
+from database import init_db, log_violation, log_plate, close_writer
+from detection import vehicle_class_ids
+from main import CameraProcessor, build_parser, camera_from_args
+from models import get_yolo, get_overspeed_model
+
+ID_STRIDE = 1_000_000   # local track IDs of segment i start at i * ID_STRIDE
+STITCH_DISTANCE = 20    # px between the two workers' view of the same track
+
+# --- Worker process side ---
+_worker = {}
+
+def init_worker(model_path, frame_size, threads):
+    model = get_yolo(model_path, warmup=True, frame_size=frame_size, threads=threads)
+    _worker["model"] = model
+    _worker["class_ids"] = vehicle_class_ids(model)
+
+def seek(cap, frame_idx):
+    """Position `cap` exactly on `frame_idx`.
+
+    Many codecs only seek to a keyframe, so the position is read back and
+    any frames short of the target are grabbed (decoded no further) until
+    it is exact; a seek that overshoots falls back to grabbing from the start.
+    """
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if pos > frame_idx or pos < 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        pos = 0
+    while pos < frame_idx:
+        if not cap.grab():
+            raise RuntimeError(f"video ended at frame {pos} while seeking to {frame_idx}")
+        pos += 1
+
+def process_segment(task):
+    """Run frames [warm_start, end) of the video; only violations from `start` on are kept."""
+    camera, index, warm_start, start, end, batch_size = task
+    model, class_ids = _worker["model"], _worker["class_ids"]
+
+    cap = cv2.VideoCapture(open_source(camera["source"]))
+    if not cap.isOpened():
+        raise RuntimeError(f"segment {index}: could not open {camera['source']}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    seek(cap, warm_start)
+
+    events = []
+    processor = CameraProcessor(camera, fps, verbose=False,
+                                log=lambda *row: events.append(("violation", row)),
+                                log_plate=lambda *row: events.append(("plate", row)))
+    processor.tracker.object_id = index * ID_STRIDE
+    processor.record_from = start
+
+    def detect(frames):
+        return processor.detect(model, frames, class_ids)
+
+    head, tail = {}, {}
+    frame_idx = warm_start
+    while frame_idx < end:
+        batch = []
+        while len(batch) < batch_size and frame_idx + len(batch) < end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            batch.append(cv2.resize(frame, camera["frame_size"]))
+        if not batch:
+            break
+        for ctx in processor.process_batch(batch, range(frame_idx, frame_idx + len(batch)), detect):
+            if ctx.frame_idx == start - 1:
+                head = dict(ctx.tracks)
+            tail = ctx.tracks
+        frame_idx += len(batch)
+
+    cap.release()
+    processor.close()   # waits for snapshots and plate reads, which append to events
+    return {"index": index, "frames": frame_idx - warm_start, "events": events,
+            "head": head, "tail": dict(tail)}
+
+# --- Parent process side ---
+def plan_segments(total_frames, n_segments, overlap_frames):
+    """(index, warm_start, start, end) for `n_segments` equal segments."""
+    bounds = np.linspace(0, total_frames, n_segments + 1).astype(int)
+    return [(i, max(0, int(s) - overlap_frames), int(s), int(e))
+            for i, (s, e) in enumerate(zip(bounds[:-1], bounds[1:])) if e > s]
+
+def stitch(tail, head, max_distance=STITCH_DISTANCE):
+    """{head id: tail id} for tracks both workers saw at the same boundary frame."""
+    if not tail or not head:
+        return {}
+    from scipy.optimize import linear_sum_assignment
+    tail_ids, head_ids = list(tail), list(head)
+    a = np.array([tail[i] for i in tail_ids], dtype=np.float64)
+    b = np.array([head[i] for i in head_ids], dtype=np.float64)
+    dist = np.hypot(*(b[:, None, :] - a[None, :, :]).transpose(2, 0, 1))
+    rows, cols = linear_sum_assignment(dist)
+    return {head_ids[r]: tail_ids[c] for r, c in zip(rows, cols) if dist[r, c] < max_distance}
+
+def remove_evidence(row):
+    """Delete the snapshot, crop and clip a violation row refers to."""
+    image_path, crop_path = row[2], row[5]
+    clip_path = row[7] if len(row) > 7 else None
+    for path in {image_path, crop_path, clip_path} - {None}:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def merge_results(results):
+    """Log every segment's events in order with stitched, global vehicle IDs."""
+    next_id = 1
+    prev_tail, prev_ids = {}, {}
+    logged = set()     # (global id, violation type) already written
+    dropped = set()    # event ids of repeats, whose plate reads are skipped too
+    counts = {"violations": 0, "repeats": 0, "stitched": 0}
+
+    for result in results:
+        links = stitch(prev_tail, result["head"])
+        ids = {local: prev_ids[prev] for local, prev in links.items() if prev in prev_ids}
+        counts["stitched"] += len(ids)
+
+        def global_id(local):
+            nonlocal next_id
+            if local not in ids:
+                ids[local] = next_id
+                next_id += 1
+            return ids[local]
+
+        for kind, row in result["events"]:
+            if kind == "violation":
+                vehicle_id, violation_type, *rest = row
+                key = (global_id(vehicle_id), violation_type)
+                if key in logged:
+                    dropped.add(row[6])
+                    remove_evidence(row)
+                    counts["repeats"] += 1
+                    continue
+                logged.add(key)
+                log_violation(key[0], violation_type, *rest)
+                counts["violations"] += 1
+            elif row[0] not in dropped:
+                log_plate(*row)
+        for local in result["tail"]:
+            global_id(local)
+        prev_tail, prev_ids = result["tail"], ids
+    return counts
+
+def run(camera, model_path, workers=None, overlap=2.0, batch_size=4):
+    if is_live_source(camera["source"]):
+        print("❌ Chunked processing needs a recorded video file")
+        return
+    cap = cv2.VideoCapture(open_source(camera["source"]))
+    if not cap.isOpened():
+        print("❌ Could not open video.")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    init_db()
+    n_workers = workers or os.cpu_count() or 1
+    tasks = [(camera, i, warm_start, start, end, batch_size)
+             for i, warm_start, start, end in plan_segments(total, n_workers, int(overlap * fps))]
+    print(f"🎬 {total} frames ({total / fps / 60:.1f} min) in {len(tasks)} segments, "
+          f"{overlap:.1f}s overlap")
+
+    if mp.get_start_method() == "fork":
+        # Loaded once here and inherited by every worker (see runner.py)
+        if not model_path.endswith(".onnx"):
+            get_yolo(model_path)
+        get_overspeed_model()
+    threads = max(1, (os.cpu_count() or 1) // len(tasks))
+
+    start = time.perf_counter()
+    with mp.Pool(len(tasks), initializer=init_worker,
+                 initargs=(model_path, camera["frame_size"], threads)) as pool:
+        results = pool.map(process_segment, tasks, chunksize=1)
+    elapsed = time.perf_counter() - start
+
+    counts = merge_results(results)
+    close_writer()
+    frames = sum(r["frames"] for r in results)
+    print(f"✅ {counts['violations']} violations logged ({counts['repeats']} boundary repeats "
+          f"dropped, {counts['stitched']} tracks stitched)")
+    print(f"⏱️  {total} frames in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} FPS, "
+          f"{frames - total} overlap frames re-processed)")
+
+if __name__ == "__main__":
+    parser = build_parser("Parallel processing of one long recorded video")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes / segments (default: one per core)")
+    parser.add_argument("--overlap", type=float, default=2.0,
+                        help="seconds each segment re-reads before its start to warm up tracking")
+    args = parser.parse_args()
+    run(camera_from_args(args), args.model, args.workers, args.overlap, max(args.batch_size, 1))
@@ -0,0 +1,111 @@
+# src/clips.py
+"""Short evidence clips around each violation, cut from an in-memory ring buffer.
+
+FrameRing keeps the last few seconds of frames in one preallocated array,
+so buffering costs a memcpy per frame and no allocation. When a violation
+fires, ClipRecorder waits until `post_seconds` more frames have arrived,
+copies the pre/post window out of the ring and encodes it on a background
+thread; the frame loop never touches the encoder.
+"""
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+class FrameRing:
+    """Fixed-capacity ring of equally sized frames, tagged with their frame index."""
+
+    def __init__(self, capacity, frame_size):
+        w, h = frame_size
+        self.frames = np.zeros((capacity, h, w, 3), dtype=np.uint8)
+        self.indexes = np.full(capacity, -1, dtype=np.int64)
+        self.capacity = capacity
+        self.size = (w, h)
+        self.head = 0
+
+    def push(self, frame, frame_idx):
+        if frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self.frames[self.head] = frame
+        self.indexes[self.head] = frame_idx
+        self.head = (self.head + 1) % self.capacity
+
+    def window(self, first, last):
+        """Copies of the buffered frames with first <= index <= last, oldest first."""
+        slots = np.flatnonzero((self.indexes >= first) & (self.indexes <= last))
+        slots = slots[np.argsort(self.indexes[slots])]
+        return self.frames[slots].copy()
+
+class ClipRecorder:
+    """Save a pre/post clip for every triggered event, encoded in the background."""
+
+    def __init__(self, fps, frame_size, pre_seconds=3.0, post_seconds=2.0, clip_fps=15.0,
+                 max_width=640, workers=1, fourcc="mp4v"):
+        # Keep every `stride`-th source frame so the ring holds clip_fps frames per second
+        self.stride = max(1, int(round(fps / clip_fps))) if clip_fps else 1
+        self.clip_fps = fps / self.stride
+        self.pre = int(round(pre_seconds * fps))    # in source frames
+        self.post = int(round(post_seconds * fps))
+        capacity = math.ceil((self.pre + self.post) / self.stride) + 2
+        w, h = frame_size
+        if w > max_width:
+            w, h = max_width, int(h * max_width / w)
+        self.ring = FrameRing(capacity, (w, h))
+        self.fourcc = fourcc
+        self.pending = []   # (last frame index, first frame index, path, on_saved)
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clip")
+
+    def push(self, frame, frame_idx):
+        """Buffer a frame (call for every frame, detected or not) and cut finished clips."""
+        if frame_idx % self.stride == 0:
+            self.ring.push(frame, frame_idx)
+        with self.lock:
+            due = [p for p in self.pending if p[0] <= frame_idx]
+            self.pending = [p for p in self.pending if p[0] > frame_idx]
+        for last, first, path, on_saved in due:
+            self.cut(first, last, path, on_saved)
+
+    def trigger(self, frame_idx, base_path, on_saved):
+        """Start a clip around `frame_idx`; `on_saved(clip_path or None)` runs once it is written."""
+        with self.lock:
+            self.pending.append((frame_idx + self.post, frame_idx - self.pre,
+                                 f"{base_path}.mp4", on_saved))
+
+    def cut(self, first, last, path, on_saved):
+        frames = self.ring.window(first, last)
+        self.pool.submit(self.write, frames, path, on_saved)
+
+    def write(self, frames, path, on_saved):
+        clip_path = None
+        try:
+            if len(frames):
+                h, w = frames.shape[1:3]
+                out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.clip_fps, (w, h))
+                if out.isOpened():
+                    for frame in frames:
+                        out.write(frame)
+                    out.release()
+                    clip_path = path
+        except cv2.error as e:
+            print(f"❌ Clip failed for {path}: {e}")
+        if clip_path is None:
+            print(f"❌ No clip written for {path}")
+        on_saved(clip_path)
+
+    def close(self):
+        """Cut every pending clip with the frames there are, then wait for the encoder."""
+        with self.lock:
+            due, self.pending = self.pending, []
+        for last, first, path, on_saved in due:
+            self.cut(first, last, path, on_saved)
+        self.pool.shutdown(wait=True)
+
+def clip_recorder_for(camera, fps):
+    """Build a ClipRecorder from a camera config, or None if clips are off."""
+    if not camera["clips"]:
+        return None
+    return ClipRecorder(fps, camera["frame_size"], pre_seconds=camera["clip_pre_seconds"],
+                        post_seconds=camera["clip_post_seconds"], clip_fps=camera["clip_fps"],
+                        max_width=camera["clip_max_width"])
@@ -0,0 +1,97 @@
+# src/config.py
+import json
+import os
+import sys
+
+# Per-camera settings; anything a camera entry leaves out falls back to these
+DEFAULT_CAMERA = {
+    "name": "cam0",
+    "source": "data/sample_video.mp4",
+    "rules": ["redlight", "overspeed"],
+    "frame_size": [800, 450],
+    "stop_line_y": 300,
+    "stop_lines": None,    # [{"points": [[x1, y1], [x2, y2]], "direction": [dx, dy]}, ...];
+                           # None = one line across the frame at stop_line_y (see zones.py)
+    "lanes": None,         # [{"name": ..., "polygon": [[x, y], ...], "direction": [dx, dy]}, ...]
+    "wrong_lane_angle": 120.0,     # degrees off a lane's direction that count as driving against it
+    "wrong_lane_min_px": 20.0,     # px a vehicle must move in a lane before its heading is judged
+    "light_state": "RED",
+    "pixels_per_meter": 8.0,
+    "speed_limit": 60,     # km/h
+    "overspeed_fast_path": True,   # compiled RF lookup instead of predict() per frame
+    "speed_window": 5,             # samples averaged per track for the speed estimate
+    "speed_kalman": False,         # constant-velocity Kalman filter instead of the window
+    "adaptive_detection": False,   # skip YOLO on frames with no motion and no tracks near a zone
+    "road_polygon": None,          # [[x, y], ...] region watched for motion; None = whole frame
+    "motion_threshold": 0.002,     # fraction of road pixels that must change to count as motion
+    "zone_margin": 40,             # px around a rule zone where tracks force detection
+    "max_skip": 10,                # detect at least every this many frames
+    "roi": None,           # regions to detect in: None = whole frame, "auto" = rule zones,
+                           # or a list of [x1, y1, x2, y2] rectangles / [[x, y], ...] polygons
+    "roi_margin": 120,     # px kept around a rule zone with roi="auto" (room for whole vehicles)
+    "dedup_window": 30.0,          # s a flagged vehicle stays flagged after it was last seen
+    "dedup_radius": 50.0,          # px: a new track this close to a just-lost flagged one is the same car
+    "dedup_reassign_window": 2.0,  # s after losing a flagged track that a new ID can inherit its flag
+    "max_tracked": 1000,           # cap on flagged tracks remembered per rule
+    "plate_ocr": False,            # read plates of violating vehicles (needs easyocr)
+    "plate_languages": ["en"],     # EasyOCR languages
+    "plate_batch_size": 8,         # crops per OCR call
+    "plate_min_area": 1500,        # px²: smaller vehicle crops are too small to read a plate from
+    "clips": False,                # save a short video around every violation
+    "clip_pre_seconds": 3.0,       # seconds kept before the violation
+    "clip_post_seconds": 2.0,      # seconds recorded after it
+    "clip_fps": 15,                # frame rate buffered and saved (lower = less memory)
+    "clip_max_width": 640,         # buffered frames are downscaled to at most this width
+    "realtime": None,      # drop frames to keep up; None = only for live streams
+    "snapshot_mode": "full",       # evidence image: "crop", "full" or "both"
+    "snapshot_quality": 90,        # JPEG quality 0-100
+    "snapshot_max_width": 800,     # full frames wider than this are downscaled
+}
+
+def is_live_source(source):
+    """Webcam indexes and network streams are live; anything else is a file."""
+    source = str(source)
+    return source.isdigit() or source.split("://")[0] in ("rtsp", "rtmp", "http", "https", "udp")
+
+def has_display():
+    """False on headless servers, where cv2.imshow would fail or waste cycles."""
+    if os.name == "nt" or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+def make_camera(**overrides):
+    """Return a full camera config with the given keys overridden."""
+    camera = dict(DEFAULT_CAMERA)
+    camera.update(overrides)
+    if camera["realtime"] is None:
+        camera["realtime"] = is_live_source(camera["source"])
+    camera["frame_size"] = tuple(camera["frame_size"])
+    return camera
+
+def load_cameras(path):
+    """Read a JSON file of the form {"cameras": [{...}, ...]} into camera configs."""
+    with open(path) as f:
+        data = json.load(f)
+
+    cameras = []
+    for i, entry in enumerate(data.get("cameras", [])):
+        if "source" not in entry:
+            raise ValueError(f"camera #{i} in {path} has no 'source'")
+        entry.setdefault("name", f"cam{i}")
+        cameras.append(make_camera(**entry))
+
+    names = [c["name"] for c in cameras]
+    if len(set(names)) != len(names):
+        raise ValueError(f"camera names in {path} must be unique")
+    return cameras
+
+def load_zones(path):
+    """Read {"stop_lines": [...], "lanes": [...]} from a JSON file as camera overrides."""
+    with open(path) as f:
+        data = json.load(f)
+    return {key: data[key] for key in ("stop_lines", "lanes") if key in data}
+
+def open_source(source):
+    """cv2.VideoCapture argument for a source: webcam index or path/URL."""
+    source = str(source)
+    return int(source) if source.isdigit() else source
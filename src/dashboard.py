@@ -1,17 +1,21 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import os
 import matplotlib.pyplot as plt
 from streamlit_autorefresh import st_autorefresh
+from queries import RunningCounts, connect_readonly, list_violations, where
+from thumbnails import ThumbnailCache
 
 # --- CONFIG ---
 st.set_page_config(page_title="Traffic Violation Dashboard", layout="wide")
 
 DB_PATH = "logs/violations.db"
+REFRESH_SECONDS = 30   # auto refresh interval; cached queries expire with it
+PAGE_SIZE = 50         # records per table page
+GALLERY_PAGE_SIZE = 12 # snapshot thumbnails per gallery page
 
-# --- AUTO REFRESH EVERY 30s ---
-st_autorefresh(interval=30000, key="refresh_dashboard")
+# --- AUTO REFRESH ---
+st_autorefresh(interval=REFRESH_SECONDS * 1000, key="refresh_dashboard")
 
 # --- HEADER ---
 st.title("🚦 Traffic Violation Detection Dashboard")
@@ -22,32 +26,98 @@ st.sidebar.header("⚙️ Dashboard Controls")
 refresh = st.sidebar.button("🔄 Refresh Data")
 
 # --- LOAD DATA ---
-@st.cache_data
-def load_data():
+# Counts are aggregated in SQL and only over rows newer than the last update;
+# the records table is fetched one page at a time. Nothing loads the whole table.
+@st.cache_resource
+def running_counts():
+    """Shared by every session, so each new row is only ever counted once."""
+    return RunningCounts()
+
+@st.cache_data(ttl=REFRESH_SECONDS)
+def load_counts():
     if not os.path.exists(DB_PATH):
-        return pd.DataFrame()
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM violations", conn)
-    conn.close()
-    return df
-
-df = load_data()
-
-if df.empty:
+        return pd.DataFrame(columns=["day", "type", "camera", "count"]), 0
+    conn = connect_readonly(DB_PATH)
+    try:
+        counts = running_counts()
+        rows = counts.update(conn)
+        return pd.DataFrame(rows, columns=["day", "type", "camera", "count"]), counts.last_id
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=REFRESH_SECONDS)
+def load_page(violation_type, camera, before_id, last_id, page_size=PAGE_SIZE):
+    """(records older than before_id, newest first; cursor of the next page or None).
+
+    `last_id` makes new rows a new cache entry.
+    """
+    conn = connect_readonly(DB_PATH)
+    try:
+        rows, cursor = list_violations(conn, page_size, before_id,
+                                       violation_type=violation_type, camera=camera)
+    finally:
+        conn.close()
+    return pd.DataFrame(rows), cursor
+
+def page_cursors(key, filters):
+    """This session's stack of before_id cursors for a listing; reset when the filters change.
+
+    Pages are walked by id (keyset) with Newer/Older buttons, so a deep page
+    costs the same to load as the first one.
+    """
+    state = st.session_state.get(key)
+    if state is None or state["filters"] != filters:
+        state = st.session_state[key] = {"filters": filters, "cursors": [None]}
+    return state["cursors"]
+
+def page_buttons(key, cursors, next_cursor, pages):
+    newer, label, older = st.columns([1, 2, 1])
+    newer.button("⬅️ Newer", key=f"{key}_newer", disabled=len(cursors) == 1, on_click=cursors.pop)
+    label.caption(f"Page {len(cursors)} of {pages}, newest first")
+    older.button("Older ➡️", key=f"{key}_older", disabled=next_cursor is None,
+                 on_click=cursors.append, args=(next_cursor,))
+
+def load_all(violation_type, camera):
+    """Every matching record, for the CSV export only."""
+    conn = connect_readonly(DB_PATH)
+    try:
+        sql, params = where(violation_type, camera)
+        return pd.read_sql_query(f"SELECT * FROM violations{sql} ORDER BY id", conn, params=params)
+    finally:
+        conn.close()
+
+@st.cache_resource
+def thumbnail_cache():
+    return ThumbnailCache()
+
+if refresh:
+    load_counts.clear()
+    load_page.clear()
+
+counts, last_id = load_counts()
+
+if counts.empty:
     st.warning("⚠️ No violations recorded yet. Run detection script first.")
 else:
     # --- SIDEBAR FILTERS ---
-    violation_types = ["All"] + sorted(df["type"].unique().tolist())
+    violation_types = ["All"] + sorted(counts["type"].dropna().unique().tolist())
     selected_type = st.sidebar.selectbox("Filter by Violation Type", violation_types)
+    cameras = ["All"] + sorted(counts["camera"].dropna().unique().tolist())
+    selected_camera = st.sidebar.selectbox("Filter by Camera", cameras)
 
-    if selected_type != "All":
-        df = df[df["type"] == selected_type]
+    violation_type = None if selected_type == "All" else selected_type
+    camera = None if selected_camera == "All" else selected_camera
+    if violation_type is not None:
+        counts = counts[counts["type"] == violation_type]
+    if camera is not None:
+        counts = counts[counts["camera"] == camera]
 
     # --- METRICS CARDS ---
-    total = len(df)
-    red_light = len(df[df["type"] == "Red Light"])
-    overspeed = len(df[df["type"] == "Overspeed"])
-    other = len(df[(df["type"] != "Red Light") & (df["type"] != "Overspeed")])
+    type_counts = counts.groupby("type")["count"].sum().sort_values(ascending=False)
+    total = int(type_counts.sum())
+    red_light = int(type_counts.get("Red Light", 0))
+    overspeed = int(type_counts.get("Overspeed", 0))
+    other = total - red_light - overspeed
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("🚗 Total Violations", total)
@@ -62,7 +132,6 @@ else:
     # Violations by type
     with col_chart1:
         st.markdown("**Violations by Type**")
-        type_counts = df["type"].value_counts()
         fig, ax = plt.subplots(figsize=(4, 3))
         type_counts.plot(kind="bar", color="crimson", ax=ax)
         plt.xlabel("Violation Type")
@@ -73,8 +142,8 @@ else:
     # Violations over time
     with col_chart2:
         st.markdown("**Violations Over Time**")
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-        daily_counts = df.groupby(df["timestamp"].dt.date)["id"].count()
+        daily_counts = counts.groupby("day")["count"].sum().sort_index()
+        daily_counts.index = pd.to_datetime(daily_counts.index, errors="coerce").date
         fig2, ax2 = plt.subplots(figsize=(4, 3))
         daily_counts.plot(kind="line", marker="o", color="darkblue", ax=ax2)
         plt.xlabel("Date")
@@ -84,30 +153,48 @@ else:
 
     # --- DATA TABLE ---
     st.subheader("📋 Violation Records")
+    cursors = page_cursors("table_pages", (violation_type, camera))
+    df, next_cursor = load_page(violation_type, camera, cursors[-1], last_id)
     st.dataframe(df, use_container_width=True)
+    page_buttons("table", cursors, next_cursor, max(1, -(-total // PAGE_SIZE)))
 
     # --- IMAGE GALLERY ---
+    # Small cached thumbnails, one page at a time; the full image only on request
     st.subheader("🖼️ Violation Snapshots")
+    gallery_cursors = page_cursors("gallery_pages", (violation_type, camera))
+    shots, next_shot = load_page(violation_type, camera, gallery_cursors[-1], last_id,
+                                 GALLERY_PAGE_SIZE)
+    thumbs = thumbnail_cache()
     img_cols = st.columns(3)
-    for idx, (_, row) in enumerate(df.iterrows()):
+    for idx, row in enumerate(shots.itertuples(index=False)):
+        thumb = thumbs.get(row.image_path)
         with img_cols[idx % 3]:
-            if os.path.exists(row["image_path"]):
-                st.image(
-                    row["image_path"],
-                    caption=f"{row['type']} | Vehicle {row['vehicle_id']}",
-                    width=250,
-                )
+            if thumb is None:
+                st.caption(f"{row.type} | Vehicle {row.vehicle_id} (image missing)")
+                continue
+            st.image(thumb, caption=f"{row.type} | Vehicle {row.vehicle_id}")
+            if st.button("🔍 Full image", key=f"full_{row.id}"):
+                st.session_state["full_image"] = (row.image_path, f"{row.type} | Vehicle {row.vehicle_id}")
+    page_buttons("gallery", gallery_cursors, next_shot, max(1, -(-total // GALLERY_PAGE_SIZE)))
+
+    full = st.session_state.get("full_image")
+    if full and os.path.exists(full[0]):
+        st.image(full[0], caption=full[1], use_container_width=True)
+        if st.button("✖ Close full image"):
+            del st.session_state["full_image"]
+            st.rerun()
 
     # --- DOWNLOAD BUTTON ---
     st.subheader("📥 Export Report")
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Download Violations Report (CSV)",
-        data=csv,
-        file_name="violations_report.csv",
-        mime="text/csv",
-        use_container_width=True,
-    )
+    if st.checkbox(f"Prepare CSV of all {total} matching violations"):
+        csv = load_all(violation_type, camera).to_csv(index=False).encode("utf-8")
+        st.download_button(
+            label="Download Violations Report (CSV)",
+            data=csv,
+            file_name="violations_report.csv",
+            mime="text/csv",
+            use_container_width=True,
+        )
 
 # --- FOOTER ---
 st.markdown("---")
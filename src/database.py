@@ -1,14 +1,69 @@
 # src/database.py
 import sqlite3
 import os
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime
 
 DB_PATH = "logs/violations.db"
 
+# Columns added after the original schema; existing databases are migrated in init_db()
+EXTRA_COLUMNS = {
+    "camera": "TEXT",
+    "crop_path": "TEXT",
+    "event_id": "TEXT",     # stable handle for writing results back to a row later
+    "plate_text": "TEXT",
+    "plate_conf": "REAL",
+    "clip_path": "TEXT",
+}
+
+# Indexes the dashboard and report queries filter / group on
+INDEXES = {
+    "idx_violations_timestamp": "timestamp",
+    "idx_violations_type": "type",
+    "idx_violations_vehicle_id": "vehicle_id",
+    "idx_violations_event_id": "event_id",
+    "idx_violations_camera": "camera",
+}
+
+# Incremental report state (see generate_report.py): violation counts by day, hour,
+# type and camera, and the last violations.id each report job has processed
+REPORT_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS violation_rollup (
+        day TEXT,
+        hour INTEGER,
+        type TEXT,
+        camera TEXT,
+        count INTEGER,
+        PRIMARY KEY (day, hour, type, camera)
+    );
+    CREATE TABLE IF NOT EXISTS report_state (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER
+    );
+'''
+
+INSERT_SQL = '''
+    INSERT INTO violations (vehicle_id, type, timestamp, image_path, camera, crop_path, event_id,
+                            clip_path)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+PLATE_SQL = "UPDATE violations SET plate_text = ?, plate_conf = ? WHERE event_id = ?"
+
+def connect(db_path=DB_PATH, **kwargs):
+    """Open a connection in WAL mode so readers never block the writer."""
+    conn = sqlite3.connect(db_path, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 def init_db():
     """Create the database and table if not exists."""
     os.makedirs("logs", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -17,25 +72,149 @@ def init_db():
             vehicle_id INTEGER,
             type TEXT,
             timestamp TEXT,
-            image_path TEXT
+            image_path TEXT,
+            camera TEXT,
+            crop_path TEXT,
+            event_id TEXT,
+            plate_text TEXT,
+            plate_conf REAL,
+            clip_path TEXT
         )
     ''')
 
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(violations)")}
+    for column, decl in EXTRA_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE violations ADD COLUMN {column} {decl}")
+
+    for name, column in INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON violations ({column})")
+
     conn.commit()
+    conn.executescript(REPORT_SCHEMA)
     conn.close()
 
-def log_violation(vehicle_id, violation_type, image_path):
-    """Insert new violation record into DB."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+class ViolationWriter:
+    """Long-lived SQLite writer that commits queued statements in batches.
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    Callers only enqueue, so the frame loop never waits on disk. A background
+    thread owns the one connection and commits whenever `batch_size`
+    statements are waiting or `flush_interval` seconds have passed, whichever
+    comes first. Pending rows are flushed on close() and at interpreter exit.
+    """
 
-    cursor.execute('''
-        INSERT INTO violations (vehicle_id, type, timestamp, image_path)
-        VALUES (?, ?, ?, ?)
-    ''', (vehicle_id, violation_type, timestamp, image_path))
+    def __init__(self, db_path=DB_PATH, batch_size=100, flush_interval=1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.written = 0
+        self.thread = threading.Thread(target=self.run, name="violation-writer", daemon=True)
+        self.thread.start()
 
-    conn.commit()
-    conn.close()
-    print(f"✅ Logged violation: Vehicle {vehicle_id} | {violation_type} | {timestamp}")
+    def execute(self, sql, params):
+        """Queue any write statement; it is committed with the next batch."""
+        self.queue.put((sql, params))
+
+    def log(self, vehicle_id, violation_type, image_path, camera=None, timestamp=None,
+            crop_path=None, event_id=None, clip_path=None):
+        """Queue one violation row."""
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.execute(INSERT_SQL, (vehicle_id, violation_type, timestamp, image_path, camera,
+                                  crop_path, event_id, clip_path))
+
+    def set_plate(self, event_id, plate_text, plate_conf):
+        """Queue the plate read for an already logged violation."""
+        self.execute(PLATE_SQL, (plate_text, plate_conf, event_id))
+
+    def flush(self):
+        """Block until everything queued so far is committed."""
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Commit what is left and stop the background thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def run(self):
+        conn = connect(self.db_path)
+        try:
+            stopping = False
+            while not stopping:
+                batch, waiters = [], []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                        break
+                    batch.append(item)
+
+                if batch:
+                    try:
+                        self.commit(conn, batch)
+                    except sqlite3.Error as e:
+                        print(f"❌ DB write failed, {len(batch)} statements lost: {e}")
+                for done in waiters:
+                    done.set()
+        finally:
+            conn.close()
+
+    def commit(self, conn, batch):
+        # Consecutive statements with the same SQL go through one executemany()
+        start = 0
+        with conn:
+            while start < len(batch):
+                sql = batch[start][0]
+                end = start
+                while end < len(batch) and batch[end][0] == sql:
+                    end += 1
+                conn.executemany(sql, [params for _, params in batch[start:end]])
+                start = end
+        self.written += len(batch)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """The process-wide writer, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ViolationWriter()
+            atexit.register(close_writer)
+        return _writer
+
+def close_writer():
+    """Flush and stop the process-wide writer, if one was started."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+        print(f"✅ Flushed {writer.written} DB writes to {writer.db_path}")
+
+def queue_depth():
+    """Statements waiting for the process-wide writer (0 if it isn't running)."""
+    writer = _writer
+    return writer.queue.qsize() if writer is not None else 0
+
+def log_violation(vehicle_id, violation_type, image_path, camera=None, timestamp=None,
+                  crop_path=None, event_id=None, clip_path=None):
+    """Queue a new violation record for the DB; committed in the background."""
+    get_writer().log(vehicle_id, violation_type, image_path, camera, timestamp, crop_path,
+                     event_id, clip_path)
+
+def log_plate(event_id, plate_text, plate_conf):
+    """Queue a plate read for the violation logged with `event_id`."""
+    get_writer().set_plate(event_id, plate_text, plate_conf)
@@ -1,12 +1,99 @@
-from ultralytics import YOLO
 import cv2
+import numpy as np
 import os
+import time
+from pipeline import Pipeline
+from config import has_display
+from models import YOLO_PATH, get_yolo
 
 # Classes we care about
 VEHICLE_CLASSES = ["car", "motorbike", "bus", "truck"]
 
-def detect_vehicles(video_path, output_path="data/output.avi"):
-    model = YOLO("yolov8n.pt")       # YOLOv8 nano model
+def vehicle_class_ids(model):
+    """Look up the model's class IDs for VEHICLE_CLASSES once, up front."""
+    return np.array([cls_id for cls_id, name in model.names.items()
+                     if name in VEHICLE_CLASSES], dtype=np.float32)
+
+def results_to_detections(result, class_ids):
+    """Filter one Ultralytics result to vehicles as an (N, 6) array.
+
+    Columns are x1, y1, x2, y2, conf, cls. The whole box tensor is moved to
+    NumPy in one go and filtered with a single mask instead of box by box.
+    """
+    data = result.boxes.data.cpu().numpy()
+    return data[np.isin(data[:, 5], class_ids)]
+
+def detect_batch(model, frames, class_ids=None):
+    """Run one inference call over a list of frames; returns one array per frame.
+
+    `model` is an Ultralytics YOLO or any backend with the same `names` and a
+    detect(frames) that returns unfiltered (N, 6) arrays (see onnx_backend.py).
+    """
+    if class_ids is None:
+        class_ids = vehicle_class_ids(model)
+    if hasattr(model, "detect"):
+        return [d[np.isin(d[:, 5], class_ids)] for d in model.detect(frames)]
+    results = model(frames, verbose=False)
+    return [results_to_detections(r, class_ids) for r in results]
+
+def detect_rois(model, frames, rects, class_ids=None):
+    """Detect only inside `rects` (x1, y1, x2, y2); boxes come back in frame coordinates.
+
+    Crops of one region all share a shape, so each region is one inference
+    call over every frame. That keeps YOLO's letterbox tight to the crop
+    instead of padding a mixed batch out to a square input.
+    """
+    if class_ids is None:
+        class_ids = vehicle_class_ids(model)
+    per_frame = [[] for _ in frames]
+    for x1, y1, x2, y2 in rects:
+        crops = [frame[y1:y2, x1:x2] for frame in frames]
+        for found, detections in zip(per_frame, detect_batch(model, crops, class_ids)):
+            detections[:, [0, 2]] += x1
+            detections[:, [1, 3]] += y1
+            found.append(detections)
+    return [np.concatenate(found) if found else np.zeros((0, 6), dtype=np.float32)
+            for found in per_frame]
+
+def get_vehicle_boxes(model, frame, class_ids=None):
+    """Detect vehicles in a single frame; returns an (N, 6) array."""
+    return detect_batch(model, [frame], class_ids)[0]
+
+def read_batches(cap, batch_size, size=None, metrics=None):
+    """Yield lists of up to `batch_size` decoded (optionally resized) frames.
+
+    With `metrics` (a CameraMetrics) each frame's decode time is recorded.
+    """
+    batch = []
+    while True:
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if size is not None:
+            frame = cv2.resize(frame, size)
+        if metrics is not None:
+            metrics.observe("decode", time.perf_counter() - start)
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def draw_detections(frame, detections, names):
+    for x1, y1, x2, y2, conf, cls_id in detections:
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{names[int(cls_id)]} {conf:.2f}",
+                    (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                    (0, 255, 0), 2)
+
+def detect_vehicles(video_path, output_path="data/output.avi", batch_size=1, show=True,
+                    threaded=False, drop_oldest=False, stats_every=None):
+    model = get_yolo(YOLO_PATH)      # YOLOv8 nano model
+    class_ids = vehicle_class_ids(model)
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print("❌ Could not open video.")
@@ -16,39 +103,82 @@ def detect_vehicles(video_path, output_path="data/output.avi"):
     w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    out = cv2.VideoWriter(output_path,
-                          cv2.VideoWriter_fourcc(*"XVID"),
-                          fps, (w, h))
+    show = show and has_display()
+    out = None
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        out = cv2.VideoWriter(output_path,
+                              cv2.VideoWriter_fourcc(*"XVID"),
+                              fps, (w, h))
+    draw = show or out is not None
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    frames_done = 0
+    start = time.perf_counter()
+    if threaded:
+        # Decode, inference and drawing + encoding each get their own thread
+        def infer(packets):
+            frames = [p.frame for p in packets]
+            for p, detections in zip(packets, detect_batch(model, frames, class_ids)):
+                p.result = detections
 
-        results = model(frame, verbose=False)
-
-        for box in results[0].boxes:
-            cls_id = int(box.cls[0])
-            label = model.names[cls_id]
-            if label in VEHICLE_CLASSES:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, f"{label} {conf:.2f}",
-                            (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6,
-                            (0, 255, 0), 2)
-
-        cv2.imshow("Vehicle Detection", frame)
-        out.write(frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+        def write(packet):
+            if not draw:
+                return None
+            draw_detections(packet.frame, packet.result, model.names)
+            if out is not None:
+                out.write(packet.frame)
+            return packet.frame if show else None
 
+        pipeline = Pipeline(cap, infer, write, batch_size=batch_size,
+                            drop_oldest=drop_oldest)
+        stats = pipeline.run("Vehicle Detection" if show else None, report_every=stats_every)
+        frames_done = stats[2]["processed"]
+        pipeline.print_stats()
+    else:
+        stopped = False
+        for batch in read_batches(cap, batch_size):
+            for frame, detections in zip(batch, detect_batch(model, batch, class_ids)):
+                if draw:
+                    draw_detections(frame, detections, model.names)
+                if out is not None:
+                    out.write(frame)
+                frames_done += 1
+                if show:
+                    cv2.imshow("Vehicle Detection", frame)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        stopped = True
+                        break
+            if stopped:
+                break
+        if show:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - start
     cap.release()
-    out.release()
-    cv2.destroyAllWindows()
-    print(f"✅ Detection complete → {output_path}")
+    if out is not None:
+        out.release()
+        print(f"✅ Detection complete → {output_path}")
+    print(f"⏱️  {frames_done} frames in {elapsed:.1f}s "
+          f"({frames_done / max(elapsed, 1e-9):.1f} FPS, batch size {batch_size})")
 
 if __name__ == "__main__":
-    detect_vehicles("data/sample_video.mp4")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="YOLOv8 vehicle detection")
+    parser.add_argument("--video", default="data/sample_video.mp4")
+    parser.add_argument("--output", default="data/output.avi")
+    parser.add_argument("--no-output", action="store_true",
+                        help="don't write the annotated video (detection timing only)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="frames per inference call (use >1 for recorded video)")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run decode, inference and encoding on separate threads")
+    parser.add_argument("--live", action="store_true",
+                        help="drop the oldest queued frames instead of blocking (threaded mode)")
+    parser.add_argument("--stats-every", type=float, default=None, metavar="SECONDS",
+                        help="print per-stage queue depth this often while running (threaded mode)")
+    parser.add_argument("--no-display", "--headless", action="store_true")
+    args = parser.parse_args()
+    detect_vehicles(args.video, None if args.no_output else args.output, batch_size=args.batch_size,
+                    show=not args.no_display, threaded=args.threaded,
+                    drop_oldest=args.live, stats_every=args.stats_every)
@@ -0,0 +1,115 @@
+# src/detection_cache.py
+"""On-disk cache of per-frame YOLO detections, for replaying rules without inference.
+
+A cache lives in CACHE_DIR/<video>_<key>/, where the key hashes the video's
+contents, the model and the frame size, so a changed file or model is a
+cache miss rather than stale boxes:
+
+    boxes.f32      every frame's (N, 6) detections back to back, raw float32
+    offsets.npy    frame i's rows are boxes[offsets[i]:offsets[i + 1]]
+    detected.npy   False for frames the adaptive scheduler skipped
+    meta.json      video, model, fps, frame size, regions of interest, frame count
+
+The box file is memory-mapped on read, so opening hours of footage costs
+nothing until frames are touched.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+CACHE_DIR = "data/cache"
+HASH_CHUNK = 4 * 1024 * 1024   # bytes hashed from each end of the video
+
+def video_hash(path):
+    """Content hash of a video: its size plus the first and last HASH_CHUNK bytes."""
+    h = hashlib.sha1()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(HASH_CHUNK))
+        if size > HASH_CHUNK:
+            f.seek(max(HASH_CHUNK, size - HASH_CHUNK))
+            h.update(f.read(HASH_CHUNK))
+    return h.hexdigest()
+
+def cache_path(video_path, model_path, frame_size, cache_dir=CACHE_DIR):
+    """Directory holding the cache for this video, model and frame size."""
+    key = hashlib.sha1(f"{video_hash(video_path)}|{os.path.basename(model_path)}|"
+                       f"{tuple(frame_size)}".encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_dir, f"{stem}_{key}")
+
+def cache_path_for(camera, model_path, cache_dir=CACHE_DIR):
+    return cache_path(camera["source"], model_path, camera["frame_size"], cache_dir)
+
+class DetectionCacheWriter:
+    """Append detections frame by frame while the normal pipeline runs."""
+
+    def __init__(self, path, meta):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.meta = dict(meta)
+        self.boxes = open(os.path.join(path, "boxes.f32"), "wb")
+        self.offsets = [0]
+        self.detected = []
+
+    def __len__(self):
+        return len(self.detected)
+
+    def add(self, frame_idx, detections):
+        """Record frame `frame_idx`; `detections` is None for a frame YOLO skipped."""
+        # Frames the pipeline never saw (dropped as stale) replay as skipped
+        while len(self.detected) < frame_idx:
+            self.offsets.append(self.offsets[-1])
+            self.detected.append(False)
+        if detections is None:
+            rows = 0
+        else:
+            detections = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+            detections.tofile(self.boxes)
+            rows = len(detections)
+        self.offsets.append(self.offsets[-1] + rows)
+        self.detected.append(detections is not None)
+
+    def close(self, complete=True):
+        """Write the index and metadata; `complete` is False if the run was cut short."""
+        self.boxes.close()
+        np.save(os.path.join(self.path, "offsets.npy"), np.array(self.offsets, dtype=np.int64))
+        np.save(os.path.join(self.path, "detected.npy"), np.array(self.detected, dtype=bool))
+        self.meta.update(frames=len(self.detected), boxes=self.offsets[-1], complete=complete)
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+        print(f"💾 Cached detections for {len(self.detected)} frames → {self.path}")
+
+class DetectionCache:
+    """Read side: memory-mapped detections by frame index."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.detected = np.load(os.path.join(path, "detected.npy"))
+        if self.offsets[-1]:
+            self.boxes = np.memmap(os.path.join(path, "boxes.f32"), dtype=np.float32,
+                                   mode="r").reshape(-1, 6)
+        else:
+            self.boxes = np.zeros((0, 6), dtype=np.float32)   # can't memmap an empty file
+        self.fps = self.meta["fps"]
+
+    def __len__(self):
+        return len(self.detected)
+
+    def __getitem__(self, frame_idx):
+        """(N, 6) detections for a frame, or None if YOLO skipped it."""
+        if not self.detected[frame_idx]:
+            return None
+        return self.boxes[self.offsets[frame_idx]:self.offsets[frame_idx + 1]]
+
+def open_cache(camera, model_path, cache_dir=CACHE_DIR):
+    """The cache for a camera's video and model, or None if there isn't one yet."""
+    path = cache_path_for(camera, model_path, cache_dir)
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return DetectionCache(path)
@@ -1,38 +1,107 @@
-import sqlite3
+import argparse
+import os
+from datetime import datetime, timedelta
 import pandas as pd
 import matplotlib.pyplot as plt
-import os
+from config import has_display
+from database import connect, init_db
 
 DB_PATH = "logs/violations.db"
-REPORT_CSV = "logs/violations_report.csv"
+REPORT_DIR = "logs/reports"
+CHART_PATH = "logs/violations_by_type.png"
+EXPORT_CHUNK = 50_000   # rows held in memory at once while exporting
+EXPORT_DELAY = 600      # s a violation waits before export, so its plate read has landed
 
-def export_to_csv():
-    """Export all violations from SQLite to CSV."""
-    if not os.path.exists(DB_PATH):
-        print("⚠️  No database found. Run detection first.")
-        return
+ROLLUP_SQL = '''
+    INSERT INTO violation_rollup (day, hour, type, camera, count)
+    SELECT substr(timestamp, 1, 10), CAST(substr(timestamp, 12, 2) AS INTEGER),
+           type, COALESCE(camera, ''), COUNT(*)
+    FROM violations
+    WHERE id > ? AND id <= ?
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (day, hour, type, camera) DO UPDATE SET count = count + excluded.count
+'''
 
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM violations", conn)
-    conn.close()
+def last_processed(conn, name):
+    row = conn.execute("SELECT last_id FROM report_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
 
-    if df.empty:
-        print("✅ No violations to export.")
-        return
+def set_processed(conn, name, last_id):
+    conn.execute("INSERT INTO report_state (name, last_id) VALUES (?, ?) "
+                 "ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id", (name, last_id))
 
-    df.to_csv(REPORT_CSV, index=False)
-    print(f"✅ Violations exported to {REPORT_CSV}")
+def update_rollup(conn):
+    """Fold the violations added since the last run into violation_rollup."""
+    with conn:
+        start = last_processed(conn, "rollup")
+        end = conn.execute("SELECT MAX(id) FROM violations").fetchone()[0] or 0
+        if end > start:
+            conn.execute(ROLLUP_SQL, (start, end))
+            set_processed(conn, "rollup", end)
+    print(f"✅ Rollup updated with {max(0, end - start)} new violation IDs")
 
-def visualize_data():
-    """Show basic stats and graphs."""
-    if not os.path.exists(REPORT_CSV):
-        print("⚠️  Run export_to_csv() first.")
-        return
+def export_partitions(conn, fmt="csv", delay=EXPORT_DELAY):
+    """Export the violations added since the last export to per-day part files, in chunks.
+
+    Each chunk becomes one file per day, day=<day>/part-<first id>.<fmt>,
+    written to a temp file and renamed into place. The cursor is saved after
+    the files, so a run that crashes in between rewrites the same parts
+    rather than exporting their rows twice.
+
+    Plates are written back to a row after it is logged (see plates.py), so
+    only rows at least `delay` seconds old are exported. A plate read later
+    than that is not in the export.
+    """
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401  (optional dependency, only for Parquet)
+        except ImportError:
+            print("❌ Parquet export needs pyarrow (pip install pyarrow)")
+            return
+    name = f"export_{fmt}"
+    start = last_processed(conn, name)
+    os.makedirs(REPORT_DIR, exist_ok=True)
 
-    df = pd.read_csv(REPORT_CSV)
+    # Stop before the first row still inside the delay, so the cursor never skips one
+    cutoff = (datetime.now() - timedelta(seconds=delay)).strftime("%Y-%m-%d %H:%M:%S")
+    end = conn.execute("SELECT MIN(id) FROM violations WHERE id > ? AND timestamp > ?",
+                       (start, cutoff)).fetchone()[0]
+    sql = "SELECT * FROM violations WHERE id > ?" + (" AND id < ?" if end else "") + " ORDER BY id"
 
-    # Violations per type
-    type_counts = df["type"].value_counts()
+    exported = 0
+    chunks = pd.read_sql_query(sql, conn, params=(start, end) if end else (start,),
+                               chunksize=EXPORT_CHUNK)
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        days = chunk["timestamp"].fillna("unknown").str[:10]
+        for day, rows in chunk.groupby(days, sort=False):
+            folder = os.path.join(REPORT_DIR, f"day={day}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"part-{int(rows['id'].iloc[0]):012d}.{fmt}")
+            tmp = path + ".tmp"
+            if fmt == "csv":
+                rows.to_csv(tmp, index=False)
+            else:
+                rows.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        exported += len(chunk)
+        with conn:
+            set_processed(conn, name, int(chunk["id"].iloc[-1]))
+
+    if exported:
+        print(f"✅ Exported {exported} new violations to {REPORT_DIR} ({fmt})")
+    else:
+        print("✅ No new violations to export.")
+
+def visualize_data(conn, show=True):
+    """Chart violations per type from the rollup (no raw rows are read)."""
+    type_counts = pd.read_sql_query(
+        "SELECT type, SUM(count) AS count FROM violation_rollup GROUP BY type ORDER BY count DESC",
+        conn).set_index("type")["count"]
+    if type_counts.empty:
+        print("✅ No violations to chart.")
+        return
 
     plt.figure(figsize=(6,4))
     type_counts.plot(kind='bar', color='crimson', edgecolor='black')
@@ -40,8 +109,32 @@ def visualize_data():
     plt.xlabel("Violation Type")
     plt.ylabel("Count")
     plt.tight_layout()
-    plt.show()
+    plt.savefig(CHART_PATH)
+    print(f"📊 Chart saved to {CHART_PATH}")
+    if show:
+        plt.show()
+
+def generate_report(fmt="csv", show=True, delay=EXPORT_DELAY):
+    if not os.path.exists(DB_PATH):
+        print("⚠️  No database found. Run detection first.")
+        return
+
+    init_db()   # creates the rollup and report_state tables on older databases
+    conn = connect(DB_PATH, timeout=30)
+    try:
+        update_rollup(conn)
+        export_partitions(conn, fmt, delay)
+        visualize_data(conn, show)
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
-    export_to_csv()
-    visualize_data()
+    parser = argparse.ArgumentParser(description="Incremental violation rollup, export and chart")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="per-day export format")
+    parser.add_argument("--no-show", action="store_true",
+                        help="only save the chart (for scheduled runs)")
+    parser.add_argument("--export-delay", type=float, default=EXPORT_DELAY,
+                        help="seconds a violation must be old before it is exported (plates settle)")
+    args = parser.parse_args()
+    generate_report(args.format, show=not args.no_show and has_display(), delay=args.export_delay)
@@ -0,0 +1,418 @@
+# src/main.py
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+import cv2
+from database import init_db, log_violation, log_plate, close_writer, queue_depth
+from detection import vehicle_class_ids, detect_batch, detect_rois, read_batches
+from tracking import CentroidTracker
+from pipeline import Pipeline
+from rules import FrameContext, build_rules
+from config import make_camera, load_zones, open_source, has_display
+from snapshots import SNAPSHOT_MODES, snapshot_writer_for
+from speed_estimation import speed_estimator_for
+from scheduler import scheduler_for
+from roi import rois_for, roi_fraction
+from detection_cache import DetectionCacheWriter, cache_path_for
+from models import YOLO_PATH, get_yolo
+from plates import plate_stage_for
+from clips import clip_recorder_for
+from metrics import camera_metrics, registry
+
+def draw_tracks(frame, tracks, speeds, rules):
+    """Draw every track's centroid, ID and speed, red once any rule has flagged it."""
+    for id, (cx, cy) in tracks.items():
+        flagged = any(id in rule.violations for rule in rules)
+        color = (0, 0, 255) if flagged else (0, 255, 0)
+        label = f"ID {id} | {int(speeds[id])} km/h" if id in speeds else f"ID {id}"
+        cv2.circle(frame, (cx, cy), 4, color, -1)
+        cv2.putText(frame, label, (cx - 10, cy - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+class CameraProcessor:
+    """Tracking, speed and rule state for one camera, fed one frame at a time.
+
+    Everything is built from the camera config: its rules, snapshot writer,
+    speed estimator, regions of interest and (when enabled) the adaptive
+    detection scheduler, plate reader and evidence clips. `log` records a
+    violation row and `log_plate` writes a plate read back to it (see database.py).
+    Stage timings and counters go to the camera's metrics (see metrics.py).
+    """
+
+    def __init__(self, camera, fps, log=log_violation, log_plate=log_plate, verbose=True):
+        self.camera = camera
+        self.name = camera["name"]
+        self.fps = fps
+        self.verbose = verbose
+        self.log = log
+        self.rules = build_rules(camera)
+        self.snapshots = snapshot_writer_for(camera)
+        self.speed_estimator = speed_estimator_for(camera)
+        self.scheduler = scheduler_for(camera, self.rules)
+        self.plates = plate_stage_for(camera, log_plate)
+        self.clips = clip_recorder_for(camera, fps)
+        self.evidence_lock = threading.Lock()
+        self.rois = rois_for(camera, self.rules)
+        if self.rois is not None and verbose:
+            print(f"🔍 [{self.name}] detecting in {len(self.rois)} region(s), "
+                  f"{roi_fraction(self.rois, camera['frame_size']):.0%} of the frame")
+        self.tracker = CentroidTracker()
+        self.metrics = camera_metrics(self.name)
+        self.cache = None   # DetectionCacheWriter while recording a detection cache
+        self.record_from = 0   # frames before this only warm up state (see chunked.py)
+        self.previous = {}   # id -> last detected (cx, cy) of every live track
+        self.speeds = {}
+
+    def record(self, ctx, id, rule):
+        """Queue the evidence snapshot; the violation is logged once it is written (or failed)."""
+        if ctx.frame_idx < self.record_from:
+            return   # the rule still remembers the vehicle, so it isn't logged again later
+        now = datetime.now()
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        prefix = f"{self.name}_" if self.name else ""
+        base_path = f"logs/{prefix}{rule.slug}_{id}_{now.strftime('%Y-%m-%d_%H-%M-%S')}"
+        if self.verbose:
+            print(f"🚨 Violation detected! Vehicle ID {id} | {rule.violation_type} at {timestamp}")
+        event_id = uuid.uuid4().hex
+        self.metrics.count("violations")
+        if ctx.frame is None:
+            # Replayed from a detection cache: there are no pixels to save
+            self.log(id, rule.violation_type, None, self.name, timestamp, None, event_id)
+            return
+        if self.plates is not None:
+            self.plates.violation(id, event_id)
+
+        # The row is logged once the snapshot (and the clip, if enabled) is on disk. A
+        # part that failed arrives as None and is logged as NULL, so the violation and
+        # whatever evidence did get written are never lost
+        saved, expected = {}, 1 if self.clips is None else 2
+
+        def part_saved(part, paths):
+            with self.evidence_lock:
+                saved[part] = paths
+                if len(saved) < expected:
+                    return
+            image_path, crop_path = saved["snapshot"]
+            clip_path = saved.get("clip")
+            try:
+                self.log(id, rule.violation_type, image_path, self.name, timestamp, crop_path,
+                         event_id, clip_path)
+            finally:
+                if self.plates is not None:
+                    self.plates.logged(event_id)   # always settles, so the event can't linger
+
+        self.snapshots.submit(ctx.frame, ctx.boxes.get(id), base_path,
+                              lambda image_path, crop_path: part_saved("snapshot", (image_path, crop_path)))
+        if self.clips is not None:
+            self.clips.trigger(ctx.frame_idx, base_path, lambda clip_path: part_saved("clip", clip_path))
+
+    def detect(self, model, frames, class_ids):
+        """Run YOLO on frames, only inside the regions of interest if the camera has any."""
+        if self.rois is None:
+            return detect_batch(model, frames, class_ids)
+        return detect_rois(model, frames, self.rois, class_ids)
+
+    def wants_detection(self, frame, frame_idx):
+        """Ask the scheduler whether this frame needs YOLO (always, if adaptive is off)."""
+        if self.scheduler is None:
+            return True
+        return self.scheduler.should_detect(frame, self.tracker, frame_idx / self.fps)
+
+    def process(self, frame, frame_idx, detections):
+        """Track this frame's detections, run every rule and record violations."""
+        metrics = self.metrics
+        start = time.perf_counter()
+        # Time comes from the frame index, so skipped frames don't distort speeds
+        if self.cache is not None:
+            self.cache.add(frame_idx, detections)
+        if self.clips is not None and frame is not None:
+            self.clips.push(frame, frame_idx)
+        timestamp = frame_idx / self.fps
+        tracks = self.tracker.update(detections, timestamp)
+        self.speed_estimator.release(self.tracker.expired)
+        if self.plates is not None and frame is not None:
+            self.plates.observe(frame, self.tracker.boxes, timestamp)
+            self.plates.tracks_ended(self.tracker.expired)
+        t_track = time.perf_counter()
+        metrics.observe("track", t_track - start)
+        ids, kmh, px_per_s = self.speed_estimator.update(tracks, timestamp)
+        self.speeds = dict(zip(ids, kmh.tolist()))
+        ctx = FrameContext(frame, frame_idx, self.fps, tracks, self.previous,
+                           self.tracker.boxes, timestamp, speeds=self.speeds,
+                           pixel_speeds=dict(zip(ids, px_per_s.tolist())))
+        t_rule = time.perf_counter()
+        metrics.observe("speed", t_rule - t_track)
+
+        # Check every rule before drawing so snapshots stay clean
+        for rule in self.rules:
+            rule.observe(ctx)
+            for id in rule.check(ctx):
+                self.record(ctx, id, rule)
+            now = time.perf_counter()
+            metrics.observe(rule.slug, now - t_rule)
+            t_rule = now
+
+        # Tracks missed this frame keep their last position until they expire,
+        # so the next move a rule sees starts where the vehicle was last seen
+        expired = set(self.tracker.expired)
+        previous = {id: p for id, p in self.previous.items() if id not in expired}
+        previous.update(tracks)
+        self.previous = previous
+        metrics.observe("frame", t_rule - start)
+        metrics.count("frames")
+        metrics.set("active_tracks", len(tracks))
+        return ctx
+
+    def coast(self, frame, frame_idx):
+        """A frame without detection: place tracks by their motion model, run no rules."""
+        if self.cache is not None:
+            self.cache.add(frame_idx, None)
+        if self.clips is not None:
+            self.clips.push(frame, frame_idx)
+        self.metrics.count("coasted_frames")
+        timestamp = frame_idx / self.fps
+        tracks = self.tracker.predict(timestamp)
+        return FrameContext(frame, frame_idx, self.fps, tracks, self.previous, {},
+                            timestamp, speeds=self.speeds)
+
+    def process_batch(self, frames, frame_idxs, detect):
+        """Process frames in order; `detect(frames)` runs once for those that need it."""
+        self.metrics.profiler.step()
+        wanted = [self.wants_detection(f, i) for f, i in zip(frames, frame_idxs)]
+        to_detect = [f for f, want in zip(frames, wanted) if want]
+        detections = []
+        if to_detect:
+            start = time.perf_counter()
+            detections = detect(to_detect)
+            self.metrics.observe("detect", time.perf_counter() - start)
+        detections = iter(detections)
+        return [self.process(f, i, next(detections)) if want else self.coast(f, i)
+                for f, i, want in zip(frames, frame_idxs, wanted)]
+
+    def close(self):
+        """Flush clips, snapshots and plate reads and report how much detection was skipped."""
+        if self.metrics.profiler.profile is not None:
+            self.metrics.profiler.finish()   # the source ended mid-profile
+        if self.clips is not None:
+            self.clips.close()
+        self.snapshots.close()
+        if self.plates is not None:
+            self.plates.close()
+            if self.verbose:
+                print(f"🔤 [{self.name}] {self.plates.reader.reads} plate crops read")
+        if self.verbose:
+            for rule in self.rules:
+                if rule.violations.suppressed:
+                    print(f"🔁 [{self.name}] {rule.violations.suppressed} repeat {rule.violation_type} "
+                          f"violations from re-identified vehicles not logged")
+        if self.scheduler is not None and self.verbose:
+            total = self.scheduler.detected + self.scheduler.skipped
+            print(f"⏭️  [{self.name}] detection ran on {self.scheduler.detected}/{total} frames")
+
+    def annotate(self, ctx):
+        for x1, y1, x2, y2 in self.rois or []:
+            cv2.rectangle(ctx.frame, (x1, y1), (x2 - 1, y2 - 1), (255, 200, 0), 1)
+        for rule in self.rules:
+            rule.draw(ctx.frame, ctx)
+        draw_tracks(ctx.frame, ctx.tracks, ctx.speeds, self.rules)
+
+def run_pipeline(camera, window_name="Traffic Violation Detection",
+                 model_path=YOLO_PATH, show=True, batch_size=1,
+                 threaded=False, drop_oldest=False, cache=False, threads=None,
+                 output_path=None, metrics_port=None, stats_every=None):
+    """Decode, detect and track once per frame, then run every rule on the tracks.
+
+    With `batch_size` > 1 frames are sent to YOLO in groups, which is faster for
+    recorded footage; tracking and rules still see frames one at a time.
+    With `threaded` decoding, inference and annotation run as separate stages
+    (see pipeline.py); `drop_oldest` sheds stale frames on live feeds.
+    With `cache` every frame's detections are also saved for replay.py.
+    A `model_path` ending in .onnx runs on ONNX Runtime with `threads` threads.
+    Annotated frames are only drawn when they are shown or written to
+    `output_path`; without a display the run is headless. With `metrics_port`
+    stage metrics and the profiler are served over HTTP (see metrics_server.py).
+    In threaded mode `stats_every` prints each stage's queue depth and rate
+    every that many seconds while frames are flowing.
+    """
+    model = get_yolo(model_path, warmup=True, frame_size=camera["frame_size"], threads=threads)
+    class_ids = vehicle_class_ids(model)
+
+    cap = cv2.VideoCapture(open_source(camera["source"]))
+    if not cap.isOpened():
+        print("❌ Could not open video.")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0   # some webcams report 0
+    print(f"FPS: {fps}")
+
+    # Initialize the SQLite database
+    init_db()
+
+    if show and not has_display():
+        print("🖥️  No display found; running headless")
+        show = False
+
+    processor = CameraProcessor(camera, fps)
+    if metrics_port:
+        from metrics_server import start_server
+        registry.gauges["db_queue_depth"] = queue_depth
+        start_server(metrics_port)
+    frame_size = camera["frame_size"]
+    out = None
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"XVID"), fps, tuple(frame_size))
+        if not out.isOpened():
+            print(f"❌ Could not open {output_path} for writing; continuing without it")
+            out = None
+    draw = show or out is not None
+    if cache and camera["realtime"]:
+        print("⚠️  Detection cache is only recorded for video files")
+    elif cache:
+        processor.cache = DetectionCacheWriter(cache_path_for(camera, model_path), {
+            "video": str(camera["source"]), "model": model_path, "fps": fps,
+            "frame_size": list(frame_size), "rois": processor.rois,
+        })
+
+    def detect(frames):
+        return processor.detect(model, frames, class_ids)
+
+    frame_idx = 0
+    start = time.perf_counter()
+    if threaded:
+        dropped = 0
+
+        def infer(packets):
+            nonlocal dropped
+            lost = pipeline.decoded.dropped + pipeline.inferred.dropped
+            if lost > dropped:
+                processor.metrics.count("dropped_frames", lost - dropped)
+                dropped = lost
+            results = processor.process_batch([p.frame for p in packets],
+                                              [p.idx for p in packets], detect)
+            for p, ctx in zip(packets, results):
+                p.result = ctx
+
+        def write(packet):
+            if not draw:
+                return None
+            processor.annotate(packet.result)
+            if out is not None:
+                out.write(packet.frame)
+            return packet.frame if show else None
+
+        pipeline = Pipeline(cap, infer, write, size=frame_size, batch_size=batch_size,
+                            drop_oldest=drop_oldest)
+        stats = pipeline.run(window_name if show else None, report_every=stats_every)
+        frame_idx = stats[1]["processed"]
+        pipeline.print_stats()
+    else:
+        stopped = False
+        # Resize for smoother processing
+        for batch in read_batches(cap, batch_size, frame_size, processor.metrics):
+            idxs = range(frame_idx, frame_idx + len(batch))
+            for ctx in processor.process_batch(batch, idxs, detect):
+                frame_idx += 1
+
+                if draw:
+                    processor.annotate(ctx)
+                if out is not None:
+                    out.write(ctx.frame)
+                if show:
+                    cv2.imshow(window_name, ctx.frame)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        stopped = True
+                        break
+            if stopped:
+                break
+        if show:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - start
+    if processor.cache is not None:
+        processor.cache.close(complete=frame_idx >= int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    cap.release()
+    if out is not None:
+        out.release()
+        print(f"🎞️  Annotated video → {output_path}")
+    processor.close()
+    close_writer()
+    print(f"⏱️  {frame_idx} frames in {elapsed:.1f}s "
+          f"({frame_idx / max(elapsed, 1e-9):.1f} FPS, batch size {batch_size})")
+
+def camera_from_args(args):
+    """Build a single-camera config from the command-line flags."""
+    return make_camera(
+        source=args.video,
+        rules=[name.strip() for name in args.rules.split(",") if name.strip()],
+        stop_line_y=args.stop_line_y,
+        light_state=args.light,
+        pixels_per_meter=args.pixels_per_meter,
+        speed_limit=args.speed_limit,
+        snapshot_mode=args.snapshot_mode,
+        snapshot_quality=args.jpeg_quality,
+        adaptive_detection=args.adaptive,
+        roi="auto" if args.roi else None,
+        plate_ocr=args.plates,
+        clips=args.clips,
+        **(load_zones(args.zones) if args.zones else {}),
+    )
+
+def build_parser(description="Traffic violation detection"):
+    """The single-camera command-line flags; other entry points add their own."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--video", default="data/sample_video.mp4")
+    parser.add_argument("--model", default=YOLO_PATH,
+                        help=".pt for PyTorch, .onnx for ONNX Runtime (see onnx_backend.py)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="inference threads for the ONNX Runtime backend")
+    parser.add_argument("--rules", default="redlight,overspeed",
+                        help="comma-separated rules to run (redlight, overspeed, wronglane)")
+    parser.add_argument("--stop-line-y", type=int, default=300)
+    parser.add_argument("--zones", default=None,
+                        help='JSON file with "stop_lines" and "lanes" (needed for wronglane)')
+    parser.add_argument("--light", default="RED", choices=["RED", "GREEN"])
+    parser.add_argument("--pixels-per-meter", type=float, default=8.0)
+    parser.add_argument("--speed-limit", type=float, default=60)
+    parser.add_argument("--snapshot-mode", default="full", choices=SNAPSHOT_MODES,
+                        help="evidence image saved per violation")
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--adaptive", action="store_true",
+                        help="skip detection on frames without motion or tracks near the stop line")
+    parser.add_argument("--roi", action="store_true",
+                        help="run detection only around the rules' zones (e.g. the stop line)")
+    parser.add_argument("--plates", action="store_true",
+                        help="read the plates of violating vehicles with EasyOCR")
+    parser.add_argument("--clips", action="store_true",
+                        help="save a short pre/post video clip of every violation")
+    parser.add_argument("--output", default=None,
+                        help="also write the annotated video here (e.g. data/output.avi)")
+    parser.add_argument("--cache", action="store_true",
+                        help="save every frame's detections so replay.py can re-run the rules")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="frames per inference call (use >1 for recorded video)")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run decode, inference and annotation on separate threads")
+    parser.add_argument("--live", action="store_true",
+                        help="drop the oldest queued frames instead of blocking (threaded mode)")
+    parser.add_argument("--no-display", "--headless", action="store_true",
+                        help="don't open a preview window or draw overlays")
+    return parser
+
+def parse_args():
+    parser = build_parser()
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics and the profiler on this local port")
+    parser.add_argument("--stats-every", type=float, default=None, metavar="SECONDS",
+                        help="print per-stage queue depth this often while running (threaded mode)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_pipeline(camera_from_args(args), model_path=args.model, show=not args.no_display,
+                 batch_size=args.batch_size, threaded=args.threaded,
+                 drop_oldest=args.live, cache=args.cache, threads=args.threads,
+                 output_path=args.output, metrics_port=args.metrics_port,
+                 stats_every=args.stats_every)
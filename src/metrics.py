@@ -0,0 +1,209 @@
+# src/metrics.py
+"""Per-camera runtime metrics and an on-demand profiler for the frame loop.
+
+Every CameraProcessor records into its own CameraMetrics: latency
+histograms per stage (decode, detect, track, speed, each rule, frame),
+counters (frames, coasted frames, drops, violations) and gauges (active
+tracks). Recording is a perf_counter() pair and a bisect per stage, so
+it stays on all the time. The process-wide `registry` holds them, plus
+snapshots sent over from runner.py's worker processes, and renders the
+lot in Prometheus text format for metrics_server.py.
+
+A camera can also be profiled with cProfile for a few seconds while it
+runs: registry.request_profile(name, seconds) is picked up by that
+camera's frame loop, which writes logs/profile_<camera>_<time>.prof.
+"""
+import bisect
+import cProfile
+import os
+import threading
+import time
+from datetime import datetime
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PROFILE_POLL = 1.0   # seconds between checks for a profiling request
+
+# HELP text for the counters and gauges the pipeline records
+DESCRIPTIONS = {
+    "frames": "Frames tracked and checked against the rules",
+    "coasted_frames": "Frames that skipped detection and were predicted instead",
+    "dropped_frames": "Frames dropped to keep up with a live source",
+    "violations": "Violations recorded",
+    "active_tracks": "Vehicles currently tracked",
+    "db_queue_depth": "Statements waiting for the SQLite writer",
+    "event_queue_depth": "Events from worker processes waiting for the parent",
+}
+
+class Histogram:
+    """Fixed-bucket latency histogram (counts per bucket, plus sum and count)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def snapshot(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts),
+                "sum": self.sum, "count": self.count}
+
+class FrameProfiler:
+    """cProfile for one camera, switched on and off between frames.
+
+    step() must be called from the thread that runs the frame loop, since
+    cProfile only sees the thread it was enabled in.
+    """
+
+    def __init__(self, name, requests):
+        self.name = name
+        self.requests = requests   # camera name -> seconds; may be a multiprocessing proxy
+        self.profile = None
+        self.until = 0.0
+        self.next_poll = 0.0
+        self.last_path = None
+
+    def step(self):
+        now = time.monotonic()
+        if self.profile is not None:
+            if now >= self.until:
+                self.finish()
+            return
+        if now < self.next_poll:
+            return
+        self.next_poll = now + PROFILE_POLL
+        seconds = self.requests.pop(self.name, None)
+        if seconds:
+            self.profile = cProfile.Profile()
+            self.until = now + seconds
+            self.profile.enable()
+
+    def finish(self):
+        self.profile.disable()
+        os.makedirs("logs", exist_ok=True)
+        path = f"logs/profile_{self.name}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.prof"
+        self.profile.dump_stats(path)
+        self.profile = None
+        self.last_path = path
+        print(f"🔬 [{self.name}] profile written to {path}")
+
+class CameraMetrics:
+    """Stage latencies, counters and gauges for one camera."""
+
+    def __init__(self, name, profile_requests):
+        self.name = name
+        self.stages = {}     # stage -> Histogram
+        self.counters = {}   # name -> running total
+        self.gauges = {}     # name -> last value
+        self.lock = threading.Lock()
+        self.profiler = FrameProfiler(name, profile_requests)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """Plain-dict copy, cheap to pickle across processes."""
+        with self.lock:
+            return {"stages": {s: h.snapshot() for s, h in self.stages.items()},
+                    "counters": dict(self.counters), "gauges": dict(self.gauges),
+                    "profiling": self.profiler.profile is not None,
+                    "last_profile": self.profiler.last_path}
+
+class MetricsRegistry:
+    """Every camera's metrics in this process, plus snapshots from worker processes."""
+
+    def __init__(self):
+        self.cameras = {}          # name -> CameraMetrics recorded here
+        self.remote = {}           # name -> latest snapshot from another process
+        self.gauges = {}           # process-wide gauge name -> callable returning a number
+        self.profile_requests = {} # camera name -> seconds to profile for
+        self.lock = threading.Lock()
+
+    def camera(self, name):
+        with self.lock:
+            metrics = self.cameras.get(name)
+            if metrics is None:
+                metrics = self.cameras[name] = CameraMetrics(name, self.profile_requests)
+            return metrics
+
+    def update_remote(self, name, snapshot):
+        self.remote[name] = snapshot
+
+    def snapshots(self):
+        """name -> snapshot for every camera, local or remote."""
+        with self.lock:
+            local = dict(self.cameras)
+        result = dict(self.remote)
+        result.update({name: m.snapshot() for name, m in local.items()})
+        return result
+
+    def request_profile(self, name, seconds):
+        self.profile_requests[name] = seconds
+
+    def render(self):
+        """All metrics in Prometheus text exposition format."""
+        snapshots = sorted(self.snapshots().items())
+        lines = []
+
+        def header(metric, kind, help):
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} {kind}")
+
+        header("traffic_stage_seconds", "histogram", "Per-frame latency of each pipeline stage")
+        for name, snap in snapshots:
+            for stage, h in sorted(snap["stages"].items()):
+                labels = f'camera="{escape(name)}",stage="{escape(stage)}"'
+                total = 0
+                for bound, n in zip(h["buckets"], h["counts"]):
+                    total += n
+                    lines.append(f'traffic_stage_seconds_bucket{{{labels},le="{bound}"}} {total}')
+                lines.append(f'traffic_stage_seconds_bucket{{{labels},le="+Inf"}} {h["count"]}')
+                lines.append(f"traffic_stage_seconds_sum{{{labels}}} {h['sum']:.6f}")
+                lines.append(f"traffic_stage_seconds_count{{{labels}}} {h['count']}")
+
+        counters = sorted({c for _, snap in snapshots for c in snap["counters"]})
+        for counter in counters:
+            metric = f"traffic_{counter}_total"
+            header(metric, "counter", DESCRIPTIONS.get(counter, counter))
+            for name, snap in snapshots:
+                if counter in snap["counters"]:
+                    lines.append(f'{metric}{{camera="{escape(name)}"}} {snap["counters"][counter]}')
+
+        gauges = sorted({g for _, snap in snapshots for g in snap["gauges"]})
+        for gauge in gauges:
+            metric = f"traffic_{gauge}"
+            header(metric, "gauge", DESCRIPTIONS.get(gauge, gauge))
+            for name, snap in snapshots:
+                if gauge in snap["gauges"]:
+                    lines.append(f'{metric}{{camera="{escape(name)}"}} {snap["gauges"][gauge]}')
+
+        for gauge, read in sorted(self.gauges.items()):
+            metric = f"traffic_{gauge}"
+            header(metric, "gauge", DESCRIPTIONS.get(gauge, gauge))
+            lines.append(f"{metric} {read()}")
+        return "\n".join(lines) + "\n"
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+registry = MetricsRegistry()
+
+def camera_metrics(name):
+    """The metrics a camera records into, created on first use."""
+    return registry.camera(name)
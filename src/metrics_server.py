@@ -0,0 +1,66 @@
+# src/metrics_server.py
+"""Local HTTP endpoint for the pipeline's metrics and profiler.
+
+    python src/main.py --metrics-port 9100
+    curl localhost:9100/metrics                      # Prometheus text format
+    curl -X POST "localhost:9100/profile/cam0?seconds=10"
+    curl localhost:9100/profile/cam0                 # top functions of the last profile
+
+The app serves metrics.registry from a background thread of the process
+that runs the cameras (the parent, with runner.py), so it costs the frame
+loop nothing between scrapes.
+"""
+import io
+import os
+import pstats
+import threading
+from metrics import registry
+
+def create_app():
+    from fastapi import FastAPI, HTTPException   # optional: only needed with --metrics-port
+    from fastapi.responses import PlainTextResponse
+
+    app = FastAPI(title="Traffic violation pipeline metrics")
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/cameras")
+    def cameras():
+        return {name: {"counters": snap["counters"], "gauges": snap["gauges"],
+                       "profiling": snap["profiling"], "last_profile": snap["last_profile"]}
+                for name, snap in registry.snapshots().items()}
+
+    @app.post("/profile/{camera}")
+    def start_profile(camera: str, seconds: float = 10.0):
+        if camera not in registry.snapshots():
+            raise HTTPException(404, f"Unknown camera {camera!r}")
+        registry.request_profile(camera, seconds)
+        return {"camera": camera, "seconds": seconds,
+                "status": "requested; the camera starts profiling within a second"}
+
+    @app.get("/profile/{camera}", response_class=PlainTextResponse)
+    def last_profile(camera: str, top: int = 30):
+        snap = registry.snapshots().get(camera)
+        if snap is None:
+            raise HTTPException(404, f"Unknown camera {camera!r}")
+        path = snap["last_profile"]
+        if path is None or not os.path.exists(path):
+            status = "profiling now" if snap["profiling"] else "no profile yet"
+            return PlainTextResponse(f"{camera}: {status}\n")
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(top)
+        return PlainTextResponse(f"{path}\n{out.getvalue()}")
+
+    return app
+
+def start_server(port, host="127.0.0.1"):
+    """Serve the metrics app on a daemon thread; returns the uvicorn server."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_app(), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="metrics-server", daemon=True)
+    thread.start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
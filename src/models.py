@@ -0,0 +1,82 @@
+# src/models.py
+"""Process-wide model registry: each model is loaded on first use, then shared.
+
+Nothing heavy happens at import time. ultralytics (and with it torch) is only
+imported the first time a YOLO model is requested, so modules that just need
+the tracking or rule code stay cheap to import. Every camera, rule and
+pipeline in a process asks the registry instead of loading its own copy.
+"""
+import os
+import threading
+import time
+import numpy as np
+from overspeed_model import MODEL_PATH, load_overspeed_model
+
+YOLO_PATH = "yolov8n.pt"
+
+_models = {}
+_lock = threading.RLock()   # loaders may ask the registry for other models
+
+def shared(key, loader):
+    """Return the object cached under `key`, calling `loader()` the first time."""
+    with _lock:
+        if key not in _models:
+            _models[key] = loader()
+        return _models[key]
+
+def loaded():
+    """Keys of everything loaded so far in this process."""
+    with _lock:
+        return list(_models)
+
+def clear():
+    """Drop every cached model (mainly for long-lived processes that switch models)."""
+    with _lock:
+        _models.clear()
+
+def load_yolo(path, threads=None):
+    """A .onnx file loads on ONNX Runtime (see onnx_backend.py), anything else on Ultralytics."""
+    start = time.perf_counter()
+    if path.endswith(".onnx"):
+        from onnx_backend import OnnxDetector
+        model = OnnxDetector(path, threads=threads)
+    else:
+        from ultralytics import YOLO   # deferred: importing torch is most of the cold start
+        model = YOLO(path)
+    print(f"📦 Loaded {path} in {time.perf_counter() - start:.1f}s")
+    return model
+
+def set_torch_threads(threads):
+    """Cap PyTorch's intra-op threads in this process (ONNX sessions take `threads` instead)."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+    except ImportError:   # nothing to cap until the PyTorch backend is installed
+        return
+    torch.set_num_threads(threads)
+
+def warm_up(model, frame_size=(800, 450), runs=1):
+    """Run a blank frame through the model so the first real frame isn't slow."""
+    blank = np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+    for _ in range(runs):
+        if hasattr(model, "detect"):
+            model.detect([blank])
+        else:
+            model([blank], verbose=False)
+
+def get_yolo(path=YOLO_PATH, warmup=False, frame_size=(800, 450), threads=None):
+    """The shared YOLO model for `path`, optionally warmed up once for `frame_size`.
+
+    `threads` caps ONNX Runtime's intra-op threads and is part of the session's
+    cache key, so a caller asking for a different cap gets its own session.
+    PyTorch's thread count is per process instead (see set_torch_threads).
+    """
+    key = ("yolo", path, threads) if path.endswith(".onnx") else ("yolo", path)
+    model = shared(key, lambda: load_yolo(path, threads))
+    if warmup:
+        shared(key + ("warm", tuple(frame_size)), lambda: warm_up(model, frame_size) or True)
+    return model
+
+def get_overspeed_model(path=MODEL_PATH):
+    """The shared overspeed Random Forest."""
+    return shared(("overspeed", path), lambda: load_overspeed_model(path))
@@ -0,0 +1,175 @@
+# src/onnx_backend.py
+"""CPU detector backend: YOLOv8 exported to ONNX and run with ONNX Runtime.
+
+    python src/onnx_backend.py --model yolov8n.pt                 # → yolov8n.onnx
+    python src/onnx_backend.py --model yolov8n.pt --int8 \\
+        --calibration data/sample_video.mp4 --calibration-frames 64  # → yolov8n.int8.onnx
+
+Pass the .onnx file anywhere a model path is taken (`--model yolov8n.int8.onnx`);
+the model registry loads it as an OnnxDetector. Its detect() returns the same
+(N, 6) [x1, y1, x2, y2, conf, cls] arrays as the Ultralytics path, in frame
+pixels, so tracking and rules don't change. benchmarks/compare_backends.py
+measures latency, throughput and accuracy drift against the PyTorch model.
+"""
+import ast
+import os
+import cv2
+import numpy as np
+
+def letterbox(frame, size):
+    """Resize keeping aspect ratio and pad to `size` (w, h); returns image, scale, (pad_x, pad_y)."""
+    h, w = frame.shape[:2]
+    scale = min(size[0] / w, size[1] / h)
+    nw, nh = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size[0] - nw) // 2, (size[1] - nh) // 2
+    out = np.full((size[1], size[0], 3), 114, dtype=np.uint8)
+    out[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return out, scale, (pad_x, pad_y)
+
+def to_input(images):
+    """Letterboxed BGR images → float32 NCHW RGB batch in [0, 1]."""
+    batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+def nms(boxes, scores, iou_threshold):
+    """Indices kept by greedy non-maximum suppression, highest score first."""
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+def postprocess(output, conf=0.25, iou=0.7, max_det=300):
+    """One image's raw (4 + classes, anchors) output → (N, 6) boxes in letterbox pixels."""
+    pred = output.T                                # (anchors, 4 + classes)
+    scores = pred[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(cls)), cls]
+    keep = best > conf
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+    xywh, best, cls = pred[keep, :4], best[keep], cls[keep]
+    boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+    # Class-aware NMS in one pass: shift each class onto its own region
+    kept = nms(boxes + cls[:, None] * 7680.0, best, iou)[:max_det]
+    return np.column_stack([boxes[kept], best[kept], cls[kept]]).astype(np.float32)
+
+class OnnxDetector:
+    """YOLOv8 ONNX model on ONNX Runtime, with the detector interface detection.py uses."""
+
+    def __init__(self, path, threads=None, conf=0.25, iou=0.7):
+        import onnxruntime as ort   # optional dependency, only needed for this backend
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.path = path
+        self.conf = conf
+        self.iou = iou
+
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        # Static exports take a fixed batch; dynamic ones show a name instead of a number
+        self.fixed_batch = inp.shape[0] if isinstance(inp.shape[0], int) else None
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        h, w = inp.shape[2:]
+        if not (isinstance(h, int) and isinstance(w, int)):
+            h, w = ast.literal_eval(meta.get("imgsz", "[640, 640]"))
+        self.input_size = (w, h)
+
+    def detect(self, frames):
+        """One (N, 6) array per frame, in that frame's pixel coordinates."""
+        if not frames:
+            return []
+        boxed = [letterbox(f, self.input_size) for f in frames]
+        batch = to_input([b[0] for b in boxed])
+        step = self.fixed_batch or len(frames)
+        outputs = [self.session.run(None, {self.input_name: batch[i:i + step]})[0]
+                   for i in range(0, len(batch), step)]
+        results = []
+        for output, (_, scale, (pad_x, pad_y)), frame in zip(np.concatenate(outputs), boxed, frames):
+            det = postprocess(output, self.conf, self.iou)
+            det[:, [0, 2]] = (det[:, [0, 2]] - pad_x) / scale
+            det[:, [1, 3]] = (det[:, [1, 3]] - pad_y) / scale
+            h, w = frame.shape[:2]
+            det[:, [0, 2]] = det[:, [0, 2]].clip(0, w)
+            det[:, [1, 3]] = det[:, [1, 3]].clip(0, h)
+            results.append(det)
+        return results
+
+def export_onnx(model_path, imgsz=640, dynamic=False):
+    """Export an Ultralytics .pt model to ONNX next to it; returns the .onnx path."""
+    from ultralytics import YOLO
+    return YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+
+def sample_frames(video_path, n):
+    """`n` frames spread evenly through a video, for calibration."""
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or n
+    frames = []
+    for idx in np.linspace(0, total - 1, n).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+def quantize_int8(onnx_path, calibration_frames, output_path=None, imgsz=640):
+    """Static INT8 quantization calibrated on real frames; returns the new model's path."""
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    output_path = output_path or onnx_path.replace(".onnx", ".int8.onnx")
+    inp = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0]
+    size = tuple(d if isinstance(d, int) else imgsz for d in (inp.shape[3], inp.shape[2]))
+
+    class Frames(CalibrationDataReader):
+        def __init__(self):
+            self.batches = iter(to_input([letterbox(f, size)[0]]) for f in calibration_frames)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {inp.name: batch}
+
+    # QDQ with per-channel weights keeps the detection head's accuracy close to FP32
+    quantize_static(onnx_path, output_path, Frames(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    per_channel=True)
+    return output_path
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export YOLOv8 to ONNX (optionally INT8)")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--dynamic", action="store_true", help="dynamic batch and image size")
+    parser.add_argument("--int8", action="store_true", help="also write an INT8-quantized copy")
+    parser.add_argument("--calibration", default="data/sample_video.mp4",
+                        help="video to draw calibration frames from")
+    parser.add_argument("--calibration-frames", type=int, default=64)
+    args = parser.parse_args()
+
+    onnx_path = export_onnx(args.model, args.imgsz, args.dynamic)
+    print(f"✅ Exported {args.model} → {onnx_path} ({os.path.getsize(onnx_path) / 1e6:.1f} MB)")
+    if args.int8:
+        frames = sample_frames(args.calibration, args.calibration_frames)
+        print(f"📐 Calibrating on {len(frames)} frames from {args.calibration}")
+        int8_path = quantize_int8(onnx_path, frames, imgsz=args.imgsz)
+        print(f"✅ Quantized → {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
@@ -0,0 +1,114 @@
+# src/overspeed_model.py
+"""Vectorized and precompiled inference for the overspeed Random Forest.
+
+The model in ml_models/overspeed_rf.pkl takes [dist_pixels, fps, pixels_per_meter].
+For one camera the last two features never change, so the forest's answer is a
+step function of dist_pixels alone: it can only flip at the split thresholds
+the trees use on feature 0. compile_overspeed() evaluates the forest once per
+interval between those thresholds and turns every later prediction into a
+np.searchsorted() lookup.
+
+    python src/overspeed_model.py --fps 30 --pixels-per-meter 8
+checks the compiled lookup against the pickled model.
+"""
+import numpy as np
+from joblib import load
+
+MODEL_PATH = "ml_models/overspeed_rf.pkl"
+OVERSPEED_LABEL = "Overspeed"
+
+def load_overspeed_model(path=MODEL_PATH):
+    return load(path)
+
+def predict_overspeed(rf_model, dist_pixels, fps, pixels_per_meter):
+    """Classify every track in one predict() call; returns a boolean array."""
+    dist_pixels = np.asarray(dist_pixels, dtype=np.float64)
+    if dist_pixels.size == 0:
+        return np.zeros(0, dtype=bool)
+    features = np.column_stack([
+        dist_pixels,
+        np.full_like(dist_pixels, fps),
+        np.full_like(dist_pixels, pixels_per_meter),
+    ])
+    return rf_model.predict(features) == OVERSPEED_LABEL
+
+def dist_thresholds(rf_model):
+    """Sorted unique split thresholds the forest uses on dist_pixels (feature 0)."""
+    thresholds = [est.tree_.threshold[est.tree_.feature == 0] for est in rf_model.estimators_]
+    return np.unique(np.concatenate(thresholds)) if thresholds else np.empty(0)
+
+class CompiledOverspeed:
+    """The forest reduced to a lookup over dist_pixels for one (fps, pixels_per_meter)."""
+
+    def __init__(self, thresholds, labels, fps, pixels_per_meter):
+        self.thresholds = thresholds   # n sorted split points
+        self.labels = labels           # n + 1 answers, one per interval
+        self.fps = fps
+        self.pixels_per_meter = pixels_per_meter
+
+    def predict(self, dist_pixels):
+        """Boolean overspeed flag per distance, identical to the forest's answer."""
+        # Trees compare float32 inputs with `x <= threshold`, so round the same
+        # way and send values equal to a threshold to the lower interval.
+        x = np.asarray(dist_pixels, dtype=np.float32).astype(np.float64)
+        return self.labels[np.searchsorted(self.thresholds, x, side="left")]
+
+def compile_overspeed(rf_model, fps, pixels_per_meter):
+    """Precompute the forest's decision for one camera's fps and scale."""
+    t = dist_thresholds(rf_model)
+    if len(t) == 0:
+        samples = np.zeros(1)
+    else:
+        # One sample strictly inside each interval (-inf, t0], (t0, t1], ..., (tn, inf)
+        samples = np.concatenate([[t[0] - 1.0], (t[:-1] + t[1:]) / 2, [t[-1] + 1.0]])
+    labels = predict_overspeed(rf_model, samples, fps, pixels_per_meter)
+    return CompiledOverspeed(t, labels, fps, pixels_per_meter)
+
+def verify_compiled(rf_model, compiled, max_dist=200.0, n_samples=20000, seed=0):
+    """Compare the lookup with the forest; returns the number of disagreements.
+
+    Checks a dense grid, random distances and every threshold with its float32
+    neighbours, which is where an off-by-one in the lookup would show up.
+    """
+    rng = np.random.default_rng(seed)
+    t = compiled.thresholds.astype(np.float32)
+    edges = np.concatenate([t, np.nextafter(t, np.float32(-np.inf)), np.nextafter(t, np.float32(np.inf))])
+    dist = np.concatenate([
+        np.linspace(0.0, max_dist, n_samples),
+        rng.uniform(0.0, max_dist, n_samples),
+        edges.astype(np.float64),
+    ])
+    expected = predict_overspeed(rf_model, dist, compiled.fps, compiled.pixels_per_meter)
+    return int(np.count_nonzero(compiled.predict(dist) != expected))
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Check the compiled overspeed lookup")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--pixels-per-meter", type=float, default=8.0)
+    parser.add_argument("--tracks", type=int, default=50, help="tracks per frame for the timing")
+    args = parser.parse_args()
+
+    rf = load_overspeed_model(args.model)
+    compiled = compile_overspeed(rf, args.fps, args.pixels_per_meter)
+    mismatches = verify_compiled(rf, compiled)
+    labels = compiled.labels
+    first = int(np.argmax(labels))
+    print(f"{len(compiled.thresholds)} thresholds on dist_pixels")
+    if labels.any() and labels[first:].all() and first > 0:
+        print(f"   → Overspeed whenever dist_pixels > {compiled.thresholds[first - 1]:.3f}")
+    print(("✅" if mismatches == 0 else "❌") + f" {mismatches} mismatches against {args.model}")
+
+    dist = np.random.default_rng(1).uniform(0, 60, args.tracks)
+    for name, fn in [
+        ("per-track predict()", lambda: [rf.predict([[d, args.fps, args.pixels_per_meter]]) for d in dist]),
+        ("one batched predict()", lambda: predict_overspeed(rf, dist, args.fps, args.pixels_per_meter)),
+        ("compiled lookup", lambda: compiled.predict(dist)),
+    ]:
+        start = time.perf_counter()
+        for _ in range(20):
+            fn()
+        print(f"   {name:<22} {(time.perf_counter() - start) / 20 * 1000:8.3f} ms/frame")
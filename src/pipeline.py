@@ -0,0 +1,263 @@
+# src/pipeline.py
+"""Staged decode → infer → annotate/encode pipeline connected by bounded queues.
+
+    reader thread ──q──▶ infer thread ──q──▶ writer thread ──q──▶ main thread (imshow)
+
+Each queue is bounded. By default a full queue blocks the stage feeding it
+(backpressure), which is what you want for recorded video: nothing is lost and
+the slowest stage sets the pace. For live feeds use `drop_oldest=True`, which
+discards the stalest frame instead so latency stays bounded.
+"""
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+
+STOP = object()   # end-of-stream marker passed down the stages
+
+class FramePacket:
+    """One frame travelling through the stages, plus whatever they attach to it."""
+
+    def __init__(self, idx, frame):
+        self.idx = idx
+        self.frame = frame
+        self.t_read = time.perf_counter()
+        self.result = None
+
+class BoundedQueue:
+    """A bounded FIFO that either blocks producers or drops its oldest item."""
+
+    def __init__(self, maxsize, drop_oldest=False):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.items = deque()
+        self.dropped = 0
+        self.cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item, stop_event=None):
+        """Add an item; returns False if the pipeline was stopped while waiting."""
+        with self.cond:
+            while len(self.items) >= self.maxsize and item is not STOP:
+                if self.drop_oldest:
+                    self.items.popleft()
+                    self.dropped += 1
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self.cond.wait(0.1)
+            self.items.append(item)
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Remove and return the oldest item; raises queue.Empty on timeout."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items, timeout):
+                raise queue.Empty
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def get_nowait(self):
+        with self.cond:
+            if not self.items:
+                raise queue.Empty
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+class StageStats:
+    """Per-stage counters: items processed, latency and the depth of its input queue."""
+
+    def __init__(self, name, in_queue=None):
+        self.name = name
+        self.in_queue = in_queue
+        self.processed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, items=1):
+        with self.lock:
+            self.processed += items
+            self.total_time += seconds
+            self.max_time = max(self.max_time, seconds)
+
+    def snapshot(self):
+        with self.lock:
+            avg = self.total_time / self.processed if self.processed else 0.0
+            return {
+                "stage": self.name,
+                "processed": self.processed,
+                "avg_ms": avg * 1000,
+                "max_ms": self.max_time * 1000,
+                "queue_depth": len(self.in_queue) if self.in_queue is not None else 0,
+                "dropped": self.in_queue.dropped if self.in_queue is not None else 0,
+            }
+
+class Pipeline:
+    """Run reader, inference and writer stages on their own threads.
+
+    `infer_fn(packets)` gets a list of up to `batch_size` packets and fills in
+    `packet.result`; `write_fn(packet)` annotates/encodes one packet and may
+    return a frame to show in the preview window. Both run on one thread each,
+    so per-frame order is preserved through tracking and rules.
+    """
+
+    def __init__(self, cap, infer_fn, write_fn, size=None, batch_size=1,
+                 queue_size=8, drop_oldest=False):
+        self.cap = cap
+        self.infer_fn = infer_fn
+        self.write_fn = write_fn
+        self.size = size
+        self.batch_size = batch_size
+        self.stop_event = threading.Event()
+
+        self.decoded = BoundedQueue(queue_size, drop_oldest)
+        self.inferred = BoundedQueue(queue_size, drop_oldest)
+        # The preview never holds the pipeline back: always keep just the newest frame
+        self.display = BoundedQueue(1, drop_oldest=True)
+
+        self.stats = [
+            StageStats("read"),
+            StageStats("infer", self.decoded),
+            StageStats("write", self.inferred),
+        ]
+        self.threads = [
+            threading.Thread(target=self.read_loop, name="reader", daemon=True),
+            threading.Thread(target=self.infer_loop, name="infer", daemon=True),
+            threading.Thread(target=self.write_loop, name="writer", daemon=True),
+        ]
+        self.error = None
+
+    # --- stages ---
+    def read_loop(self):
+        idx = 0
+        try:
+            while not self.stop_event.is_set():
+                t0 = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                if self.size is not None:
+                    frame = cv2.resize(frame, self.size)
+                self.stats[0].record(time.perf_counter() - t0)
+                if not self.decoded.put(FramePacket(idx, frame), self.stop_event):
+                    break
+                idx += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.decoded.put(STOP)
+
+    def infer_loop(self):
+        try:
+            done = False
+            while not done and not self.stop_event.is_set():
+                try:
+                    packet = self.decoded.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if packet is STOP:
+                    break
+
+                # Take whatever else is already waiting, up to one batch
+                batch = [packet]
+                while len(batch) < self.batch_size:
+                    try:
+                        packet = self.decoded.get_nowait()
+                    except queue.Empty:
+                        break
+                    if packet is STOP:
+                        done = True
+                        break
+                    batch.append(packet)
+
+                t0 = time.perf_counter()
+                self.infer_fn(batch)
+                self.stats[1].record(time.perf_counter() - t0, len(batch))
+                for packet in batch:
+                    if not self.inferred.put(packet, self.stop_event):
+                        return
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.inferred.put(STOP)
+
+    def write_loop(self):
+        try:
+            while True:
+                try:
+                    packet = self.inferred.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if packet is STOP:
+                    break
+                t0 = time.perf_counter()
+                shown = self.write_fn(packet)
+                self.stats[2].record(time.perf_counter() - t0)
+                if shown is not None:
+                    self.display.put(shown)
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.display.put(STOP)
+
+    # --- control ---
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop_event.set()
+
+    def stop(self):
+        """Ask every stage to finish; the reader stops and queued frames are skipped."""
+        self.stop_event.set()
+
+    def run(self, window_name=None, report_every=None):
+        """Start the stages and block until the stream ends or 'q' is pressed.
+
+        The preview window is driven from the calling thread, since most GUI
+        backends only allow that.
+        """
+        for t in self.threads:
+            t.start()
+        last_report = time.perf_counter()
+        try:
+            while True:
+                try:
+                    frame = self.display.get(timeout=0.05)
+                except queue.Empty:
+                    frame = None
+                if frame is STOP:
+                    break
+                if frame is not None and window_name is not None:
+                    cv2.imshow(window_name, frame)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        self.stop()
+                if report_every and time.perf_counter() - last_report >= report_every:
+                    self.print_stats()
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            self.stop()
+        finally:
+            self.stop_event.set()
+            for t in self.threads:
+                t.join()
+            if window_name is not None:
+                cv2.destroyAllWindows()
+        if self.error is not None:
+            raise self.error
+        return self.snapshot()
+
+    def snapshot(self):
+        return [s.snapshot() for s in self.stats]
+
+    def print_stats(self):
+        for s in self.snapshot():
+            print(f"   {s['stage']:<6} processed={s['processed']:<6} "
+                  f"avg={s['avg_ms']:.1f}ms max={s['max_ms']:.1f}ms "
+                  f"queue={s['queue_depth']} dropped={s['dropped']}")
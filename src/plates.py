@@ -0,0 +1,221 @@
+# src/plates.py
+"""License plate reading, once per violating track and off the frame loop.
+
+While a track is alive PlateStage keeps its best crop, scored on box area
+times sharpness (variance of the Laplacian). When a track that has
+violated a rule ends, its best crop is queued, once, for a background
+PlateReader, which sends crops through EasyOCR in batches. The result is
+written back to every violation row the track produced, by event_id, and
+only after that row has been logged, so the UPDATE can never arrive
+before the INSERT.
+"""
+import queue
+import threading
+import cv2
+from models import shared
+from track_state import ExpiringStore
+
+PLATE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+def sharpness(image):
+    """Variance of the Laplacian: higher means less motion blur."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+def plate_region(crop):
+    """The lower half of a vehicle crop, where the plate is."""
+    return crop[crop.shape[0] // 2:]
+
+def get_ocr_reader(languages=("en",), gpu=False):
+    """The shared EasyOCR reader (loading it takes seconds, so only once per process)."""
+    def load():
+        import easyocr   # optional dependency, only needed with plate_ocr on
+        return easyocr.Reader(list(languages), gpu=gpu, verbose=False)
+    return shared(("easyocr", tuple(languages), gpu), load)
+
+class BestCrops:
+    """The best-quality crop seen so far for every live track.
+
+    Crops of tracks that violated a rule are held outside the size- and
+    time-bounded store until they are popped, so eviction can never take
+    the only crop a plate read depends on.
+    """
+
+    def __init__(self, ttl=60.0, max_size=500, min_area=1500):
+        self.crops = ExpiringStore(ttl, max_size)   # id -> (score, area, crop)
+        self.held = {}   # id -> (score, area, crop) or None, for protected tracks
+        self.min_area = min_area
+
+    def best(self, id):
+        return self.held.get(id) if id in self.held else self.crops.get(id)
+
+    def keep(self, id, now, best=None):
+        """Store a new best crop (or just refresh the track) where the track lives."""
+        if id in self.held:
+            if best is not None:
+                self.held[id] = best
+        else:
+            self.crops.touch(id, now, best)
+
+    def offer(self, frame, boxes, now):
+        h, w = frame.shape[:2]
+        for id, (x1, y1, x2, y2) in boxes.items():
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+            area = (x2 - x1) * (y2 - y1)
+            best = self.best(id)
+            # Sharpness is only worth computing for a crop at least nearly as big
+            if area < self.min_area or (best is not None and area < 0.8 * best[1]):
+                if best is not None:
+                    self.keep(id, now)
+                continue
+            crop = frame[y1:y2, x1:x2]
+            score = area * sharpness(plate_region(crop))
+            if best is None or score > best[0]:
+                self.keep(id, now, (score, area, crop.copy()))
+            else:
+                self.keep(id, now)
+        self.crops.expire(now)
+
+    def protect(self, id):
+        """Hold a track's crop (and any better one to come) until pop()."""
+        if id not in self.held:
+            self.held[id] = self.crops.pop(id)
+
+    def pop(self, id):
+        """Hand over (and forget) a track's best crop, or None if it never had one."""
+        best = self.held.pop(id) if id in self.held else self.crops.pop(id)
+        return None if best is None else best[2]
+
+class PlateReader:
+    """Background thread that OCRs queued plate crops in batches."""
+
+    def __init__(self, languages=("en",), batch_size=8, gpu=False):
+        self.languages = languages
+        self.batch_size = batch_size
+        self.gpu = gpu
+        self.queue = queue.Queue()
+        self.reads = 0     # OCR'd crops
+        self.thread = threading.Thread(target=self.run, name="plate-ocr", daemon=True)
+        self.thread.start()
+
+    def submit(self, crop, on_read):
+        """Queue one crop; `on_read(text, conf)` is called from the OCR thread."""
+        self.queue.put((crop, on_read))
+
+    def close(self):
+        """Read everything still queued, then stop."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [item for item in batch if item is not None]
+            if batch:
+                self.read(batch)
+
+    def read(self, batch):
+        crops = [plate_region(crop) for crop, _ in batch]
+        try:
+            reader = get_ocr_reader(self.languages, self.gpu)
+            # Same-size inputs let EasyOCR recognise the whole batch in one pass
+            results = reader.readtext_batched(crops, n_width=320, n_height=160,
+                                              allowlist=PLATE_CHARS, batch_size=len(crops))
+        except Exception as e:
+            print(f"❌ Plate OCR failed for {len(batch)} crops: {e}")
+            results = [[] for _ in batch]   # settle the events as unread
+        else:
+            self.reads += len(batch)
+        for (_, on_read), found in zip(batch, results):
+            text, conf = best_text(found)
+            on_read(text, conf)
+
+def best_text(found):
+    """The most confident plate-like string among EasyOCR's (box, text, conf) results."""
+    candidates = [("".join(c for c in text.upper() if c in PLATE_CHARS), conf)
+                  for _, text, conf in found]
+    candidates = [(text, conf) for text, conf in candidates if len(text) >= 4]
+    if not candidates:
+        return None, 0.0
+    text, conf = max(candidates, key=lambda c: c[1])
+    return text, float(conf)
+
+class PlateStage:
+    """Ties best crops, violations, logged rows and OCR results together for one camera."""
+
+    def __init__(self, reader, write_back, crops=None):
+        self.reader = reader
+        self.write_back = write_back   # write_back(event_id, text, conf)
+        self.crops = crops or BestCrops()
+        self.pending = {}   # track id -> event ids of its violations, until the track ends
+        self.events = {}    # event id -> {"logged": bool, "plate": (text, conf) or None}
+        self.lock = threading.Lock()
+
+    def observe(self, frame, boxes, now):
+        self.crops.offer(frame, boxes, now)
+
+    def violation(self, id, event_id):
+        with self.lock:
+            self.pending.setdefault(id, []).append(event_id)
+            self.events[event_id] = {"logged": False, "plate": None}
+        self.crops.protect(id)
+
+    def logged(self, event_id):
+        """The violation row is queued for the DB; its plate may now be written."""
+        self.settle(event_id, logged=True)
+
+    def tracks_ended(self, ids):
+        """Send the best crop of every ended track that violated something to OCR, once."""
+        for id in ids:
+            with self.lock:
+                event_ids = self.pending.pop(id, None)
+            crop = self.crops.pop(id)
+            if not event_ids:
+                continue
+            if crop is None:
+                for event_id in event_ids:
+                    self.settle(event_id, plate=(None, 0.0))
+                continue
+
+            def on_read(text, conf, event_ids=event_ids):
+                for event_id in event_ids:
+                    self.settle(event_id, plate=(text, conf))
+            self.reader.submit(crop, on_read)
+
+    def settle(self, event_id, logged=False, plate=None):
+        with self.lock:
+            state = self.events.get(event_id)
+            if state is None:
+                return
+            state["logged"] |= logged
+            if plate is not None:
+                state["plate"] = plate
+            if not (state["logged"] and state["plate"] is not None):
+                return
+            del self.events[event_id]
+        text, conf = state["plate"]
+        if text is not None:
+            self.write_back(event_id, text, conf)
+
+    def close(self):
+        """OCR the tracks still alive, wait for the reader; call after snapshots are flushed."""
+        with self.lock:
+            ids = list(self.pending)
+        self.tracks_ended(ids)
+        self.reader.close()
+
+def plate_stage_for(camera, write_back):
+    """Build a PlateStage from a camera config, or None if plate OCR is off."""
+    if not camera["plate_ocr"]:
+        return None
+    reader = PlateReader(languages=tuple(camera["plate_languages"]),
+                         batch_size=camera["plate_batch_size"])
+    return PlateStage(reader, write_back, BestCrops(min_area=camera["plate_min_area"]))
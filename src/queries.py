@@ -0,0 +1,165 @@
+# src/queries.py
+"""Read-side SQL over the violations table, for the dashboard, reports and API.
+
+Counting and paging happen in SQLite on indexed columns, so what a query
+costs depends on the rows it returns, not on how big the table has grown.
+Listings page by id (keyset), never by OFFSET.
+"""
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from database import DB_PATH
+
+# GROUP BY expressions count_by() accepts; timestamps are "YYYY-MM-DD HH:MM:SS" text
+GROUPS = {
+    "type": "type",
+    "camera": "camera",
+    "vehicle": "vehicle_id",
+    "day": "substr(timestamp, 1, 10)",
+    "hour": "substr(timestamp, 1, 13) || ':00'",
+}
+
+def connect_readonly(db_path=DB_PATH, **kwargs):
+    """Open a read-only connection; in WAL mode it reads while the writer commits."""
+    uri = pathlib.Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, **kwargs)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+class ReadPool:
+    """Up to `size` read-only connections, shared by request threads.
+
+    Connections are opened on demand and reused; a caller that finds them
+    all busy waits for one to come back.
+    """
+
+    def __init__(self, db_path=DB_PATH, size=4):
+        self.db_path = db_path
+        self.size = size
+        self.idle = queue.Queue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.size:
+                # Count the slot only once the connection exists: a failed open
+                # (e.g. no database yet) must not use it up for good
+                conn = connect_readonly(self.db_path, check_same_thread=False, timeout=10)
+                self.opened += 1
+                return conn
+        # Every slot holds a connection, so at least one is checked out and will come back
+        return self.idle.get()
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn(conn, *args, **kwargs) on a pooled connection."""
+        with self.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+            with self.lock:
+                self.opened -= 1
+
+def where(violation_type=None, camera=None, after_id=None, before_id=None, vehicle_id=None,
+          since=None, until=None):
+    """SQL WHERE clause and its parameters for the usual filters (None = any).
+
+    `since` and `until` are "YYYY-MM-DD[ HH:MM:SS]" strings; `until` is exclusive.
+    """
+    clauses, params = [], []
+    for clause, value in (("type = ?", violation_type), ("camera = ?", camera),
+                          ("id > ?", after_id), ("id < ?", before_id),
+                          ("vehicle_id = ?", vehicle_id),
+                          ("timestamp >= ?", since), ("timestamp < ?", until)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def as_dicts(cursor):
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def max_id(conn):
+    """Highest violation id so far (0 for an empty table); a rowid lookup, not a scan."""
+    return conn.execute("SELECT MAX(id) FROM violations").fetchone()[0] or 0
+
+def list_violations(conn, limit=50, before_id=None, **filters):
+    """(rows as dicts, newest first; cursor for the next page or None).
+
+    Pass the returned cursor back as `before_id` to get the next page.
+    """
+    sql, params = where(before_id=before_id, **filters)
+    rows = as_dicts(conn.execute(f"SELECT * FROM violations{sql} ORDER BY id DESC LIMIT ?",
+                                 params + [limit + 1]))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (rows[-1]["id"] if more else None)
+
+def rows_after(conn, after_id, limit=500, **filters):
+    """Rows with id > after_id, oldest first (for following new violations)."""
+    sql, params = where(after_id=after_id, **filters)
+    return as_dicts(conn.execute(f"SELECT * FROM violations{sql} ORDER BY id LIMIT ?",
+                                 params + [limit]))
+
+def count_by(conn, by, **filters):
+    """[(group, count)] for one of GROUPS, largest first (time groups in order)."""
+    expr = GROUPS[by]
+    sql, params = where(**filters)
+    order = "grp" if by in ("day", "hour") else "n DESC"
+    return conn.execute(f"SELECT {expr} AS grp, COUNT(*) AS n FROM violations{sql} "
+                        f"GROUP BY grp ORDER BY {order}", params).fetchall()
+
+def counts_since(conn, after_id=0):
+    """(day, type, camera, count, max id) per group for the rows with id > after_id."""
+    return conn.execute('''
+        SELECT substr(timestamp, 1, 10) AS day, type, camera, COUNT(*), MAX(id)
+        FROM violations
+        WHERE id > ?
+        GROUP BY day, type, camera
+    ''', (after_id,)).fetchall()
+
+class RunningCounts:
+    """Violation counts by day, type and camera, kept up to date incrementally.
+
+    Every update() only aggregates the rows added since the last one (by id),
+    so refreshing costs the same whether the table holds a thousand rows or
+    a few million.
+    """
+
+    def __init__(self):
+        self.counts = {}    # (day, type, camera) -> count
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def update(self, conn):
+        with self.lock:
+            for day, violation_type, camera, n, top in counts_since(conn, self.last_id):
+                key = (day, violation_type, camera)
+                self.counts[key] = self.counts.get(key, 0) + n
+                self.last_id = max(self.last_id, top)
+            return self.rows()
+
+    def rows(self):
+        """(day, type, camera, count) for every group seen so far."""
+        return [(*key, n) for key, n in self.counts.items()]
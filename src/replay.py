@@ -0,0 +1,80 @@
+# src/replay.py
+"""Re-run tracking and the violation rules from a detection cache.
+
+Record the cache once with the normal pipeline:
+
+    python src/main.py --video data/sample_video.mp4 --cache --no-display
+
+then replay it with different thresholds, with no decoding and no inference.
+Comma-separated values sweep every combination:
+
+    python src/replay.py --video data/sample_video.mp4 --stop-line-y 280,300,320 --speed-limit 50,60
+
+Replays don't write to the database and save no snapshots.
+"""
+import argparse
+import itertools
+import time
+from collections import Counter
+from config import make_camera
+from detection_cache import open_cache
+from main import CameraProcessor
+from models import YOLO_PATH
+
+def replay(camera, cache, verbose=False):
+    """Run one camera config over cached detections; returns the violation rows."""
+    violations = []
+    processor = CameraProcessor(camera, cache.fps, log=lambda *row: violations.append(row),
+                                verbose=verbose)
+    if processor.rois is not None and [list(r) for r in processor.rois] != cache.meta["rois"]:
+        print(f"⚠️  Cache was recorded with regions {cache.meta['rois']}, "
+              f"this config detects in {processor.rois}")
+    for frame_idx in range(len(cache)):
+        detections = cache[frame_idx]
+        if detections is None:
+            processor.coast(None, frame_idx)
+        else:
+            processor.process(None, frame_idx, detections)
+    processor.close()
+    return violations
+
+def parse_list(value, cast):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay violation rules from cached detections")
+    parser.add_argument("--video", default="data/sample_video.mp4")
+    parser.add_argument("--model", default=YOLO_PATH, help="model the cache was recorded with")
+    parser.add_argument("--rules", default="redlight,overspeed")
+    parser.add_argument("--light", default="RED", choices=["RED", "GREEN"])
+    parser.add_argument("--stop-line-y", default="300", help="one value or a comma-separated sweep")
+    parser.add_argument("--pixels-per-meter", default="8.0", help="one value or a comma-separated sweep")
+    parser.add_argument("--speed-limit", default="60", help="one value or a comma-separated sweep")
+    parser.add_argument("--verbose", action="store_true", help="print every violation")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    rules = [name.strip() for name in args.rules.split(",") if name.strip()]
+    cache = open_cache(make_camera(source=args.video), args.model)
+    if cache is None:
+        raise SystemExit(f"❌ No detection cache for {args.video} with {args.model}; "
+                         f"record one with: python src/main.py --video {args.video} --cache")
+    if not cache.meta["complete"]:
+        print("⚠️  The recording run was cut short; replaying the frames it saw")
+    print(f"📼 {len(cache)} frames, {cache.meta['boxes']} boxes from {cache.path}")
+
+    sweep = list(itertools.product(parse_list(args.stop_line_y, int),
+                                   parse_list(args.pixels_per_meter, float),
+                                   parse_list(args.speed_limit, float)))
+    print(f"{'stop_line_y':>11} {'px/m':>6} {'limit':>6} {'violations':>11}  by type")
+    for stop_line_y, pixels_per_meter, speed_limit in sweep:
+        camera = make_camera(source=args.video, rules=rules, light_state=args.light,
+                             stop_line_y=stop_line_y, pixels_per_meter=pixels_per_meter,
+                             speed_limit=speed_limit)
+        start = time.perf_counter()
+        violations = replay(camera, cache, verbose=args.verbose)
+        elapsed = time.perf_counter() - start
+        by_type = Counter(row[1] for row in violations)
+        print(f"{stop_line_y:>11} {pixels_per_meter:>6g} {speed_limit:>6g} {len(violations):>11}  "
+              f"{dict(by_type)}  ({len(cache) / max(elapsed, 1e-9):,.0f} frames/s)")
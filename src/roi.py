@@ -0,0 +1,78 @@
+# src/roi.py
+"""Regions of interest: the parts of a frame the rules actually look at.
+
+A camera's `roi` setting is either None (detect on the whole frame), a list
+of rectangles [x1, y1, x2, y2] and/or polygons [[x, y], ...], or "auto" to
+take the zones from the camera's rules (the stop-line approach for red light).
+Polygons are reduced to their bounding rectangle, since that is what gets
+cropped. Overlapping regions are merged so no pixel is sent to YOLO twice.
+"""
+import numpy as np
+
+def clip_rect(rect, frame_size):
+    """Integer (x1, y1, x2, y2) clipped to a (width, height) frame, or None if empty."""
+    w, h = frame_size
+    x1, y1, x2, y2 = rect
+    x1, y1 = max(0, int(np.floor(x1))), max(0, int(np.floor(y1)))
+    x2, y2 = min(w, int(np.ceil(x2))), min(h, int(np.ceil(y2)))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2, y2)
+
+def region_to_rect(region):
+    """A rectangle [x1, y1, x2, y2] as is, or the bounding rectangle of a polygon."""
+    points = np.asarray(region, dtype=np.float64)
+    if points.ndim == 1 and len(points) == 4:
+        return tuple(points)
+    return (*points.min(axis=0), *points.max(axis=0))
+
+def merge_rects(rects):
+    """Union overlapping rectangles until none overlap."""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(rects)
+
+def auto_regions(camera, rules):
+    """Rule zones, padded by roi_margin; None if some rule needs the whole road."""
+    regions = []
+    for rule in rules:
+        rect = rule.zone_rect(camera["frame_size"], camera["roi_margin"])
+        if rect is None:
+            # e.g. overspeed tracks vehicles along the whole road
+            if not camera["road_polygon"]:
+                return None
+            rect = region_to_rect(camera["road_polygon"])
+        regions.append(rect)
+    return regions
+
+def rois_for(camera, rules):
+    """The merged, clipped detection rectangles for a camera, or None for full frames."""
+    setting = camera["roi"]
+    if not setting:
+        return None
+    regions = auto_regions(camera, rules) if setting == "auto" else [region_to_rect(r) for r in setting]
+    if not regions:
+        return None
+    rects = [clip_rect(r, camera["frame_size"]) for r in regions]
+    rects = merge_rects(r for r in rects if r is not None)
+    w, h = camera["frame_size"]
+    if not rects or rects == [(0, 0, w, h)]:
+        return None
+    return rects
+
+def roi_fraction(rects, frame_size):
+    """Share of the frame's pixels that detection still looks at."""
+    w, h = frame_size
+    return sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rects) / float(w * h)
@@ -0,0 +1,241 @@
+# src/rules.py
+import cv2
+import numpy as np
+from overspeed_model import MODEL_PATH, predict_overspeed, compile_overspeed, verify_compiled
+from models import shared, get_overspeed_model
+from track_state import ExpiringStore, ViolationMemory, violation_memory_for
+from zones import zones_for
+
+class FrameContext:
+    """Everything a rule needs to know about one processed frame."""
+
+    def __init__(self, frame, frame_idx, fps, tracks, previous, boxes, timestamp=None,
+                 speeds=None, pixel_speeds=None):
+        self.frame = frame
+        self.frame_idx = frame_idx
+        self.fps = fps
+        self.timestamp = frame_idx / fps if timestamp is None else timestamp  # video seconds
+        self.tracks = tracks          # id -> (cx, cy) in this frame
+        self.previous = previous      # id -> (cx, cy) where each live track was last detected
+        self.boxes = boxes            # id -> (x1, y1, x2, y2) in this frame
+        self.speeds = speeds or {}               # id -> smoothed km/h
+        self.pixel_speeds = pixel_speeds or {}   # id -> smoothed px/s
+
+class ViolationRule:
+    """Base class for a violation check run on every frame's tracks."""
+
+    violation_type = "Violation"   # value stored in the `type` column
+    slug = "violation"             # prefix for snapshot filenames
+
+    def __init__(self, memory=None):
+        self.violations = memory or ViolationMemory()   # flagged IDs, expiring (see track_state.py)
+
+    def check(self, ctx):
+        """Return the IDs that newly violate this rule in this frame."""
+        raise NotImplementedError
+
+    def draw(self, frame, ctx):
+        """Draw the rule's overlay (lines, labels) onto the frame."""
+
+    def near_zone(self, points, margin):
+        """Boolean per (N, 2) point: is it within `margin` px of this rule's zone?"""
+        return np.zeros(len(points), dtype=bool)
+
+    def zone_rect(self, frame_size, margin):
+        """(x1, y1, x2, y2) the rule needs detections in, or None for the whole frame."""
+        return None
+
+    def observe(self, ctx):
+        """Called every frame before check(): keep the flagged-track memory current."""
+        self.violations.observe(ctx.tracks, ctx.timestamp)
+
+    def flag(self, id, ctx):
+        """Remember a violating ID; True only for a new violation, not a repeat of a recent one."""
+        return self.violations.flag(id, ctx.timestamp, ctx.tracks.get(id), ctx.tracks)
+
+def moves(ctx):
+    """IDs seen now and before, with (N, 2) last known and current positions."""
+    ids = [id for id in ctx.tracks if id in ctx.previous]
+    start = np.array([ctx.previous[id] for id in ids], dtype=np.float64).reshape(-1, 2)
+    end = np.array([ctx.tracks[id] for id in ids], dtype=np.float64).reshape(-1, 2)
+    return ids, start, end
+
+class RedLightRule(ViolationRule):
+    """Flag tracks that cross a stop line while the light is red.
+
+    Each track's move since the last processed frame is intersected with
+    every stop line of the camera's ZoneMap (see zones.py), so a vehicle is
+    caught however many pixels it covered between two detections.
+    """
+
+    violation_type = "Red Light"
+    slug = "redlight"
+
+    def __init__(self, zones, light_state="RED", line_thickness=3, memory=None):
+        super().__init__(memory)
+        self.zones = zones
+        self.light_state = light_state
+        self.line_thickness = line_thickness
+
+    def check(self, ctx):
+        if self.light_state != "RED" or not len(self.zones.segments):
+            return []
+        ids, start, end = moves(ctx)
+        if not ids:
+            return []
+        crossed = self.zones.crossings(start, end).any(axis=1)
+        return [id for id, hit in zip(ids, crossed.tolist()) if hit and self.flag(id, ctx)]
+
+    def near_zone(self, points, margin):
+        return self.zones.distance_to_lines(points) < margin
+
+    def zone_rect(self, frame_size, margin):
+        # The stop-line approach: every line, `margin` px either side of it
+        return self.zones.lines_rect(margin)
+
+    def draw(self, frame, ctx):
+        # Draw stop lines
+        line_color = (0, 0, 255) if self.light_state == "RED" else (0, 255, 0)
+        for (x1, y1), (x2, y2) in np.round(self.zones.segments).astype(int).tolist():
+            cv2.line(frame, (x1, y1), (x2, y2), line_color, self.line_thickness)
+
+        # Display light status
+        cv2.putText(frame, f"LIGHT: {self.light_state}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, line_color, 2)
+
+class WrongLaneRule(ViolationRule):
+    """Flag tracks driving against their lane's allowed direction.
+
+    The lane of every track is one lookup in the ZoneMap's label mask. A
+    track's heading is measured from where it entered its current lane,
+    once it has moved `min_distance` px, so detector jitter on slow or
+    queued vehicles doesn't count as driving the wrong way. It is wrong
+    when it is more than `max_angle` degrees off the lane's direction.
+    """
+
+    violation_type = "Wrong Lane"
+    slug = "wronglane"
+
+    def __init__(self, zones, max_angle=120.0, min_distance=20.0, memory=None):
+        super().__init__(memory)
+        self.zones = zones
+        self.max_cos = np.cos(np.radians(max_angle))
+        self.min_distance = min_distance
+        # id -> (lane, x, y) where the track entered its current lane
+        self.entries = ExpiringStore(self.violations.flagged.ttl, self.violations.flagged.max_size)
+
+    def check(self, ctx):
+        ids = list(ctx.tracks)
+        if not ids or not self.zones.lanes:
+            return []
+        points = np.array([ctx.tracks[id] for id in ids], dtype=np.float64)
+        lanes = self.zones.lane_at(points)
+
+        # Where each track entered the lane it is in now (here, if it just did)
+        anchors = np.empty_like(points)
+        for i, (id, lane) in enumerate(zip(ids, lanes.tolist())):
+            entry = self.entries.get(id)
+            if entry is None or entry[0] != lane:
+                entry = (lane, *points[i])
+            self.entries.touch(id, ctx.timestamp, entry)
+            anchors[i] = entry[1:]
+        self.entries.expire(ctx.timestamp)
+
+        travel = points - anchors
+        distance = np.hypot(travel[:, 0], travel[:, 1])
+        heading = (travel * self.zones.lane_directions[lanes]).sum(axis=1) / np.maximum(distance, 1e-9)
+        wrong = (lanes > 0) & (distance >= self.min_distance) & (heading < self.max_cos)
+        return [id for id, hit in zip(ids, wrong.tolist()) if hit and self.flag(id, ctx)]
+
+    def near_zone(self, points, margin):
+        # Direction is judged along the whole lane, so any track in one needs detection
+        return self.zones.lane_at(points) > 0
+
+    def zone_rect(self, frame_size, margin):
+        return self.zones.lanes_rect(margin) if self.zones.lanes else None
+
+    def draw(self, frame, ctx):
+        for lane, direction in zip(self.zones.lanes, self.zones.lane_directions[1:]):
+            polygon = np.round(np.asarray(lane["polygon"], dtype=np.float64)).astype(np.int32)
+            cv2.polylines(frame, [polygon], True, (255, 255, 0), 1)
+            # Arrow from the lane's centre along its allowed direction
+            cx, cy = polygon.mean(axis=0)
+            tip = (int(cx + 30 * direction[0]), int(cy + 30 * direction[1]))
+            cv2.arrowedLine(frame, (int(cx), int(cy)), tip, (255, 255, 0), 2, tipLength=0.4)
+
+class OverspeedRule(ViolationRule):
+    """Flag tracks the Random Forest calls Overspeed or that exceed the speed limit.
+
+    Speeds come smoothed from the camera's SpeedEstimator via the frame
+    context. All tracks in a frame are classified together. With `fast_path`
+    the forest is compiled into a lookup over dist_pixels the first time the
+    camera's fps is known (see overspeed_model.py) and checked against the
+    real model once; if they ever disagree the rule keeps using the model.
+    The forest and its compiled lookups are shared through the model registry.
+    """
+
+    violation_type = "Overspeed"
+    slug = "overspeed"
+
+    def __init__(self, pixels_per_meter=8.0, speed_limit=60, model_path=MODEL_PATH,
+                 fast_path=True, memory=None):
+        super().__init__(memory)
+        self.pixels_per_meter = pixels_per_meter
+        self.speed_limit = speed_limit  # fallback limit (km/h)
+        self.model_path = model_path
+        self.rf_model = get_overspeed_model(model_path)
+        self.fast_path = fast_path
+        self.compiled = None
+
+    def classifier(self, fps):
+        """Return a function dist_pixels -> overspeed flags for this fps."""
+        if self.fast_path and (self.compiled is None or self.compiled.fps != fps):
+            self.compiled = shared(("overspeed-compiled", self.model_path, fps, self.pixels_per_meter),
+                                   lambda: self.compile(fps))
+            if self.compiled is None:
+                print("⚠️  Compiled overspeed lookup disagrees with the model; using the model")
+                self.fast_path = False
+        if self.fast_path:
+            return self.compiled.predict
+        return lambda dist: predict_overspeed(self.rf_model, dist, fps, self.pixels_per_meter)
+
+    def compile(self, fps):
+        """The verified lookup for this fps, or None if it disagrees with the forest."""
+        compiled = compile_overspeed(self.rf_model, fps, self.pixels_per_meter)
+        return compiled if verify_compiled(self.rf_model, compiled) == 0 else None
+
+    def check(self, ctx):
+        ids = list(ctx.pixel_speeds)
+        if not ids:
+            return []
+
+        speed_kmh = np.array([ctx.speeds[id] for id in ids])
+        # The model was trained on pixels moved per source frame
+        dist_pixels = np.array([ctx.pixel_speeds[id] for id in ids]) / ctx.fps
+
+        # --- Predict with Random Forest (one call for every track) ---
+        overspeed = self.classifier(ctx.fps)(dist_pixels) | (speed_kmh > self.speed_limit)
+        return [id for id, hit in zip(ids, overspeed.tolist()) if hit and self.flag(id, ctx)]
+
+def build_rules(camera):
+    """Instantiate the rules a camera config asks for, with its own thresholds."""
+    rules = []
+    zones = zones_for(camera)   # masks rasterized once, shared by the zone rules
+    for name in camera["rules"]:
+        if name == "redlight":
+            rules.append(RedLightRule(zones, light_state=camera["light_state"],
+                                      memory=violation_memory_for(camera)))
+        elif name == "wronglane":
+            if not zones.lanes:
+                raise ValueError(f"camera {camera['name']!r}: the wronglane rule needs 'lanes'")
+            rules.append(WrongLaneRule(zones, max_angle=camera["wrong_lane_angle"],
+                                       min_distance=camera["wrong_lane_min_px"],
+                                       memory=violation_memory_for(camera)))
+        elif name == "overspeed":
+            rules.append(OverspeedRule(pixels_per_meter=camera["pixels_per_meter"],
+                                       speed_limit=camera["speed_limit"],
+                                       fast_path=camera["overspeed_fast_path"],
+                                       memory=violation_memory_for(camera)))
+        else:
+            raise ValueError(f"Unknown rule: {name}")
+    return rules
@@ -0,0 +1,278 @@
+# src/runner.py
+"""Run many cameras on one node with a process pool.
+
+    python src/runner.py --config cameras.json [--workers 8]
+
+Cameras are split round-robin into one group per worker process (at most one
+worker per core). The parent loads the models once before forking, each worker
+warms YOLO up on a blank frame of each of its cameras' sizes, then steps through its cameras
+in turn and sends one frame from each through a single batched inference call
+(cameras with regions of interest detect on their own crops instead).
+Violations and throughput counters travel back over a queue to the parent,
+where one thread is the only writer to the SQLite store.
+
+Cameras marked `realtime` (live streams by default) skip frames they have
+fallen behind on instead of lagging further; those skips are reported as
+dropped frames per camera.
+
+With --metrics-port the parent serves every camera's stage metrics (sent
+along with the throughput counters) and the profiler; profiling requests
+reach the workers through a shared dict (see metrics.py).
+"""
+import argparse
+import multiprocessing as mp
+import os
+import threading
+import time
+import cv2
+from config import load_cameras, open_source
+from database import init_db, log_violation, log_plate, close_writer, queue_depth
+from detection import vehicle_class_ids, detect_batch
+from main import CameraProcessor
+from models import YOLO_PATH, get_yolo, get_overspeed_model, set_torch_threads
+from metrics import registry
+
+STATS_INTERVAL = 5.0   # seconds between throughput reports
+
+def usable_cores():
+    """Cores this process may run on; unlike cpu_count() this respects cpusets and taskset."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:   # not available on macOS or Windows
+        return os.cpu_count() or 1
+
+# --- Worker process side ---
+_worker = {}
+
+def init_worker(model_path, events, threads, profile_requests=None):
+    """Pool initializer: get the model (inherited from the parent when forked)."""
+    if profile_requests is not None:
+        registry.profile_requests = profile_requests   # shared with the parent's metrics server
+    if not model_path.endswith(".onnx"):
+        set_torch_threads(threads)   # PyTorch would otherwise use every core in every worker
+    model = get_yolo(model_path, threads=threads)
+    _worker["model_path"] = model_path
+    _worker["model"] = model
+    _worker["class_ids"] = vehicle_class_ids(model)
+    _worker["events"] = events
+
+class CameraStream:
+    """One camera inside a worker: its capture, pacing, rules and counters."""
+
+    def __init__(self, camera, events):
+        self.camera = camera
+        self.name = camera["name"]
+        self.events = events
+        self.cap = cv2.VideoCapture(open_source(camera["source"]))
+        self.done = not self.cap.isOpened()
+        if self.done:
+            print(f"❌ [{self.name}] Could not open {camera['source']}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.processor = CameraProcessor(camera, self.fps, log=self.log, log_plate=self.log_plate)
+        self.frame_idx = 0     # position in the source, including dropped frames
+        self.processed = 0
+        self.dropped = 0
+        self.started = time.perf_counter()
+
+    def log(self, *row):
+        # Same arguments as database.log_violation; the parent does the insert
+        self.events.put(("violation", row))
+
+    def log_plate(self, *row):
+        # Same arguments as database.log_plate
+        self.events.put(("plate", row))
+
+    def read(self):
+        """Return the next frame to process, or None once the source has ended."""
+        metrics = self.processor.metrics
+        if self.camera["realtime"]:
+            # Skip (grab without decoding) every frame we are already late for
+            due = int((time.perf_counter() - self.started) * self.fps)
+            while self.frame_idx < due - 1:
+                if not self.cap.grab():
+                    self.done = True
+                    return None
+                self.frame_idx += 1
+                self.dropped += 1
+                metrics.count("dropped_frames")
+
+        start = time.perf_counter()
+        ret, frame = self.cap.read()
+        if not ret:
+            self.done = True
+            return None
+        self.frame_idx += 1
+        frame = cv2.resize(frame, self.camera["frame_size"])
+        metrics.observe("decode", time.perf_counter() - start)
+        return frame
+
+    def report(self):
+        self.events.put(("stats", self.name, {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "elapsed": time.perf_counter() - self.started,
+            "done": self.done,
+        }, self.processor.metrics.snapshot()))
+
+def run_camera_group(cameras):
+    """Worker task: process a group of cameras round-robin until all have ended."""
+    model = _worker["model"]
+    class_ids = _worker["class_ids"]
+    # Warm up once per frame size this group uses, before anything is timed
+    for camera in cameras:
+        get_yolo(_worker["model_path"], warmup=True, frame_size=camera["frame_size"])
+    streams = [CameraStream(c, _worker["events"]) for c in cameras]
+
+    last_report = time.perf_counter()
+    while not all(s.done for s in streams):
+        owners, frames = [], []
+        for s in streams:
+            if s.done:
+                continue
+            s.processor.metrics.profiler.step()
+            frame = s.read()
+            if frame is None:
+                continue
+            if s.processor.wants_detection(frame, s.frame_idx - 1):
+                owners.append(s)
+                frames.append(frame)
+            else:
+                s.processor.coast(frame, s.frame_idx - 1)
+                s.processed += 1
+
+        # Full-frame cameras share one inference call; cameras with regions
+        # of interest run their own crops
+        shared = [i for i, s in enumerate(owners) if s.processor.rois is None]
+        detections = [None] * len(owners)
+        if shared:
+            start = time.perf_counter()
+            found = detect_batch(model, [frames[i] for i in shared], class_ids)
+            elapsed = time.perf_counter() - start
+            for i, d in zip(shared, found):
+                detections[i] = d
+                owners[i].processor.metrics.observe("detect", elapsed)
+        for s, frame, d in zip(owners, frames, detections):
+            if d is None:
+                start = time.perf_counter()
+                d = s.processor.detect(model, [frame], class_ids)[0]
+                s.processor.metrics.observe("detect", time.perf_counter() - start)
+            s.processor.process(frame, s.frame_idx - 1, d)
+            s.processed += 1
+
+        if time.perf_counter() - last_report >= STATS_INTERVAL:
+            for s in streams:
+                s.report()
+            last_report = time.perf_counter()
+
+    for s in streams:
+        s.cap.release()
+        s.processor.close()
+        s.report()
+    return [s.name for s in streams]
+
+# --- Parent process side ---
+def split_cameras(cameras, n_groups):
+    """Deal cameras round-robin into `n_groups` non-empty groups."""
+    groups = [cameras[i::n_groups] for i in range(n_groups)]
+    return [g for g in groups if g]
+
+def writer_loop(events, stats):
+    """Drain violations, plate reads and stats from every worker; rows go to the one DB writer."""
+    while True:
+        kind, *payload = events.get()
+        if kind == "stop":
+            break
+        if kind == "violation":
+            log_violation(*payload[0])
+        elif kind == "plate":
+            log_plate(*payload[0])
+        elif kind == "stats":
+            name, counters, snapshot = payload
+            stats[name] = counters
+            registry.update_remote(name, snapshot)
+
+def print_stats(stats):
+    print("📈 Per-camera throughput")
+    for name, s in sorted(stats.items()):
+        fps = s["processed"] / max(s["elapsed"], 1e-9)
+        seen = s["processed"] + s["dropped"]
+        drop_pct = 100.0 * s["dropped"] / seen if seen else 0.0
+        flag = "⚠️ overloaded" if s["dropped"] and not s["done"] else ""
+        print(f"   {name:<20} {fps:6.1f} FPS  processed={s['processed']:<7} "
+              f"dropped={s['dropped']:<6} ({drop_pct:4.1f}%) {flag}")
+
+def event_queue_depth(events):
+    try:
+        return events.qsize()
+    except NotImplementedError:   # macOS
+        return 0
+
+def run(config_path, model_path=YOLO_PATH, workers=None, metrics_port=None):
+    cameras = load_cameras(config_path)
+    if not cameras:
+        print("⚠️  No cameras in config.")
+        return
+
+    init_db()
+    cores = usable_cores()
+    n_workers = workers or min(len(cameras), cores)
+    groups = split_cameras(cameras, n_workers)
+    print(f"🚦 {len(cameras)} cameras across {len(groups)} worker processes")
+
+    # Split the cores between workers so their inference thread pools don't fight
+    threads = max(1, cores // len(groups))
+    if mp.get_start_method() == "fork":
+        # Load once here; forked workers share the weights instead of each reading them.
+        # ONNX Runtime sessions aren't fork-safe, so those are created in each worker.
+        if not model_path.endswith(".onnx"):
+            get_yolo(model_path)
+        get_overspeed_model()
+
+    events = mp.Queue()
+    stats = {}
+    writer = threading.Thread(target=writer_loop, args=(events, stats), daemon=True)
+    writer.start()
+
+    profile_requests = None
+    if metrics_port:
+        from metrics_server import start_server
+        manager = mp.Manager()
+        profile_requests = registry.profile_requests = manager.dict()
+        registry.gauges["db_queue_depth"] = queue_depth
+        registry.gauges["event_queue_depth"] = lambda: event_queue_depth(events)
+        start_server(metrics_port)
+
+    pool = mp.Pool(len(groups), initializer=init_worker,
+                   initargs=(model_path, events, threads, profile_requests))
+    try:
+        result = pool.map_async(run_camera_group, groups, chunksize=1)
+        while not result.ready():
+            result.wait(STATS_INTERVAL)
+            if stats and not result.ready():
+                print_stats(stats)
+        result.get()
+        pool.close()
+    except KeyboardInterrupt:
+        print("🛑 Stopping cameras...")
+        pool.terminate()
+    finally:
+        # Joining lets every worker flush what it still has queued for the writer
+        pool.join()
+        events.put(("stop",))
+        writer.join()
+        close_writer()
+
+    print_stats(stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-camera violation detection")
+    parser.add_argument("--config", default="cameras.json",
+                        help="JSON camera list (see cameras.example.json)")
+    parser.add_argument("--model", default=YOLO_PATH,
+                        help=".pt for PyTorch, .onnx for ONNX Runtime (see onnx_backend.py)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core, at most one per camera)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics and the profiler on this local port")
+    args = parser.parse_args()
+    run(args.config, args.model, args.workers, args.metrics_port)
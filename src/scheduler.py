@@ -0,0 +1,78 @@
+# src/scheduler.py
+"""Decide per frame whether full YOLO detection is worth running.
+
+Detection runs when cheap frame differencing over the road region sees
+motion, when a live track is (predicted to be) close to a rule zone such as
+the stop line, or when `max_skip` frames have passed without detection. On
+the frames in between the tracker's constant-velocity model places the tracks
+instead, and speeds use the real time between processed frames.
+"""
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Frame differencing on a small grayscale copy of the road region."""
+
+    def __init__(self, frame_size, road_polygon=None, scale=0.25, pixel_threshold=25,
+                 min_changed=0.002):
+        self.size = (max(1, int(frame_size[0] * scale)), max(1, int(frame_size[1] * scale)))
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.mask = np.ones((self.size[1], self.size[0]), dtype=bool)
+        if road_polygon:
+            poly = (np.asarray(road_polygon, dtype=np.float64) * scale).astype(np.int32)
+            mask = np.zeros(self.mask.shape, dtype=np.uint8)
+            cv2.fillPoly(mask, [poly], 1)
+            self.mask = mask.astype(bool)
+        self.mask_pixels = max(1, int(self.mask.sum()))
+        self.prev = None
+        self.changed = 0.0   # fraction of road pixels that changed, last call
+
+    def motion(self, frame):
+        """True if enough of the road changed since the previous frame."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        prev, self.prev = self.prev, gray
+        if prev is None:
+            return True
+        diff = cv2.absdiff(gray, prev) > self.pixel_threshold
+        self.changed = np.count_nonzero(diff & self.mask) / self.mask_pixels
+        return self.changed >= self.min_changed
+
+class AdaptiveScheduler:
+    """Run detection only when the scene or the rules need it."""
+
+    def __init__(self, gate, rules, zone_margin=40, max_skip=10):
+        self.gate = gate
+        self.rules = rules
+        self.zone_margin = zone_margin
+        self.max_skip = max_skip
+        self.since_detect = max_skip   # detect on the first frame
+        self.detected = 0
+        self.skipped = 0
+
+    def near_zone(self, tracker, timestamp):
+        if len(tracker) == 0:
+            return False
+        points = tracker.predicted_centroids(timestamp)
+        return any(rule.near_zone(points, self.zone_margin).any() for rule in self.rules)
+
+    def should_detect(self, frame, tracker, timestamp):
+        # Always run the gate so its reference frame stays current
+        motion = self.gate.motion(frame)
+        self.since_detect += 1
+        if motion or self.since_detect > self.max_skip or self.near_zone(tracker, timestamp):
+            self.since_detect = 0
+            self.detected += 1
+            return True
+        self.skipped += 1
+        return False
+
+def scheduler_for(camera, rules):
+    """Build an AdaptiveScheduler from a camera config, or None if it's disabled."""
+    if not camera["adaptive_detection"]:
+        return None
+    gate = MotionGate(camera["frame_size"], camera["road_polygon"],
+                      min_changed=camera["motion_threshold"])
+    return AdaptiveScheduler(gate, rules, zone_margin=camera["zone_margin"],
+                             max_skip=camera["max_skip"])
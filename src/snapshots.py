@@ -0,0 +1,77 @@
+# src/snapshots.py
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+SNAPSHOT_MODES = ("crop", "full", "both")
+
+class SnapshotWriter:
+    """Encode evidence JPEGs on a small thread pool, off the frame loop.
+
+    `mode` picks what is saved for each violation: the vehicle crop, the full
+    frame (downscaled to at most `max_width` pixels wide), or both.
+    `on_saved(image_path, crop_path)` runs only once the files are actually on
+    disk, so a DB row logged from it never points at a missing image. If no
+    file could be written both paths are None: the violation is still logged,
+    just without evidence.
+    """
+
+    def __init__(self, mode="full", jpeg_quality=90, max_width=800, crop_margin=0.15, workers=2):
+        if mode not in SNAPSHOT_MODES:
+            raise ValueError(f"snapshot mode must be one of {SNAPSHOT_MODES}, got {mode!r}")
+        self.mode = mode
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self.crop_margin = crop_margin
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+
+    def crop(self, frame, box):
+        """Copy the vehicle box plus a margin, clipped to the frame."""
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = box[:4]
+        mx = int((x2 - x1) * self.crop_margin)
+        my = int((y2 - y1) * self.crop_margin)
+        x1, y1 = max(0, int(x1) - mx), max(0, int(y1) - my)
+        x2, y2 = min(w, int(x2) + mx), min(h, int(y2) + my)
+        return frame[y1:y2, x1:x2].copy()
+
+    def submit(self, frame, box, base_path, on_saved):
+        """Queue the snapshot(s) for `base_path` (no extension) and return at once.
+
+        Only the pixels that will be saved are copied here, so the caller is
+        free to draw on or reuse `frame` straight away.
+        """
+        full = frame.copy() if self.mode in ("full", "both") else None
+        crop = self.crop(frame, box) if self.mode in ("crop", "both") and box is not None else None
+        return self.pool.submit(self.write, full, crop, base_path, on_saved)
+
+    def write(self, full, crop, base_path, on_saved):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        image_path = crop_path = None
+        try:
+            if full is not None:
+                h, w = full.shape[:2]
+                if w > self.max_width:
+                    full = cv2.resize(full, (self.max_width, int(h * self.max_width / w)),
+                                      interpolation=cv2.INTER_AREA)
+                if cv2.imwrite(f"{base_path}.jpg", full, params):
+                    image_path = f"{base_path}.jpg"
+            if crop is not None and crop.size:
+                if cv2.imwrite(f"{base_path}_crop.jpg", crop, params):
+                    crop_path = f"{base_path}_crop.jpg"
+        except cv2.error as e:
+            print(f"❌ Snapshot failed for {base_path}: {e}")
+
+        if image_path is None and crop_path is None:
+            print(f"❌ No snapshot written for {base_path}; violation logged without one")
+        # The dashboard shows image_path, so fall back to the crop when it's all we have
+        on_saved(image_path or crop_path, crop_path)
+
+    def close(self):
+        """Wait for every queued snapshot (and its DB callback) to finish."""
+        self.pool.shutdown(wait=True)
+
+def snapshot_writer_for(camera):
+    """Build a SnapshotWriter from a camera config's snapshot_* settings."""
+    return SnapshotWriter(mode=camera["snapshot_mode"],
+                          jpeg_quality=camera["snapshot_quality"],
+                          max_width=camera["snapshot_max_width"])
@@ -1,118 +1,238 @@
-from ultralytics import YOLO
-import cv2
-import math
-import time
-from collections import defaultdict
-
-# Load YOLOv8 model (Nano for fastest speed)
-model = YOLO("yolov8n.pt")
-
-# Vehicle classes YOLO can detect
-VEHICLE_CLASSES = ["car", "motorbike", "bus", "truck"]
-
-# Tracking data structures
-tracked_objects = {}
-previous_positions = {}
-speed_history = defaultdict(list)
-object_id = 0
-
-# Conversion constant (tune based on video)
-PIXELS_PER_METER = 9.0
-
-# Load video
-cap = cv2.VideoCapture("data/sample_video.mp4")
-fps = cap.get(cv2.CAP_PROP_FPS)
-print(f"Video FPS: {fps}")
-
-# Resize for smoother inference
-resize_width, resize_height = 640, 360
-
-# FPS monitoring
-prev_time = time.time()
-
-def get_center(x1, y1, x2, y2):
-    return (int((x1 + x2) / 2), int((y1 + y2) / 2))
-
-frame_count = 0
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.resize(frame, (resize_width, resize_height))
-    frame_count += 1
-
-    # Skip alternate frames for better performance
-    if frame_count % 2 != 0:
-        continue
-
-    results = model(frame, verbose=False)
-    detections = []
-
-    for box in results[0].boxes:
-        cls_id = int(box.cls[0])
-        label = model.names[cls_id]
-        if label in VEHICLE_CLASSES:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            detections.append((x1, y1, x2, y2))
-
-    current_objects = {}
-
-    for (x1, y1, x2, y2) in detections:
-        cx, cy = get_center(x1, y1, x2, y2)
-        same_object_detected = False
-
-        for id, pt in tracked_objects.items():
-            dist = math.hypot(cx - pt[0], cy - pt[1])
-            if dist < 35:
-                current_objects[id] = (cx, cy)
-                same_object_detected = True
-                break
-
-        if not same_object_detected:
-            object_id += 1
-            current_objects[object_id] = (cx, cy)
-
-    # Speed Calculation
-    for id, new_pt in current_objects.items():
-        if id in previous_positions:
-            prev_pt = previous_positions[id]
-            dist_pixels = math.hypot(new_pt[0] - prev_pt[0], new_pt[1] - prev_pt[1])
-
-            # Ignore unrealistic jumps
-            if 1 < dist_pixels < 100:
-                dist_meters = dist_pixels / PIXELS_PER_METER
-                speed_m_per_s = dist_meters * fps
-                speed_kmh = speed_m_per_s * 3.6
-
-                if 0.5 < speed_kmh < 200:
-                    # Smooth speed using moving average
-                    speed_history[id].append(speed_kmh)
-                    if len(speed_history[id]) > 5:
-                        speed_history[id].pop(0)
-                    avg_speed = sum(speed_history[id]) / len(speed_history[id])
-
-                    cv2.putText(frame, f"ID {id} | {int(avg_speed)} km/h",
-                                (new_pt[0] - 20, new_pt[1] - 20),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+# src/speed_estimation.py
+import numpy as np
+
+class SpeedEstimator:
+    """Smoothed per-track speeds from fixed-size, array-backed ring buffers.
+
+    Each track gets a slot holding its last `window` centroids and timestamps.
+    Speeds for all active tracks are computed in one vectorized step as the
+    mean of the valid per-step speeds in the window, using the real time
+    between samples (so skipped frames don't distort the result). With
+    `kalman=True` a constant-velocity Kalman filter per slot is used instead.
+    Slots are recycled when a track expires, so memory stays flat.
+    """
+
+    def __init__(self, pixels_per_meter, window=5, capacity=64, kalman=False,
+                 min_step_px=1.0, max_step_px=100.0, min_kmh=0.5, max_kmh=200.0,
+                 process_noise=50.0, measurement_noise=4.0):
+        self.pixels_per_meter = pixels_per_meter
+        self.window = window
+        self.kalman = kalman
+        # Ignore unrealistic jumps and jitter
+        self.min_step_px = min_step_px
+        self.max_step_px = max_step_px
+        self.min_kmh = min_kmh
+        self.max_kmh = max_kmh
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+
+        self.slots = {}      # track id -> slot index
+        self.free = []
+        self.capacity = 0
+        self.positions = np.zeros((0, window, 2))
+        self.times = np.zeros((0, window))
+        self.counts = np.zeros(0, dtype=np.int64)
+        # Kalman state [x, y, vx, vy] and covariance per slot
+        self.state = np.zeros((0, 4))
+        self.cov = np.zeros((0, 4, 4))
+        self.grow(capacity)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def grow(self, capacity):
+        """Enlarge the backing arrays to hold `capacity` tracks."""
+        extra = capacity - self.capacity
+        self.positions = np.concatenate([self.positions, np.zeros((extra, self.window, 2))])
+        self.times = np.concatenate([self.times, np.zeros((extra, self.window))])
+        self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int64)])
+        self.state = np.concatenate([self.state, np.zeros((extra, 4))])
+        self.cov = np.concatenate([self.cov, np.zeros((extra, 4, 4))])
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def slot_for(self, id):
+        slot = self.slots.get(id)
+        if slot is None:
+            if not self.free:
+                self.grow(self.capacity * 2)
+            slot = self.free.pop()
+            self.slots[id] = slot
+            self.counts[slot] = 0
+        return slot
+
+    def release(self, ids):
+        """Forget expired tracks and hand their slots back."""
+        for id in ids:
+            slot = self.slots.pop(id, None)
+            if slot is not None:
+                self.free.append(slot)
+
+    def update(self, tracks, timestamp):
+        """Add this frame's centroids; returns (ids, km/h array, px/s array).
+
+        Only tracks with a usable speed are returned.
+        """
+        if not tracks:
+            return [], np.zeros(0), np.zeros(0)
+        ids = list(tracks)
+        slots = np.array([self.slot_for(id) for id in ids], dtype=np.int64)
+        points = np.array([tracks[id] for id in ids], dtype=np.float64)
+
+        if self.kalman:
+            px_per_s, valid = self.kalman_step(slots, points, timestamp)
         else:
-            cv2.putText(frame, f"ID {id}", (new_pt[0] - 10, new_pt[1] - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-    previous_positions = current_objects.copy()
-    tracked_objects = current_objects.copy()
-
-    # FPS display
-    curr_time = time.time()
-    fps_live = 1 / (curr_time - prev_time)
-    prev_time = curr_time
-    cv2.putText(frame, f"FPS: {int(fps_live)}", (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-    cv2.imshow("Smooth Speed Estimation", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+            px_per_s, valid = self.window_step(slots, points, timestamp)
+
+        kmh = px_per_s / self.pixels_per_meter * 3.6
+        valid &= (kmh > self.min_kmh) & (kmh < self.max_kmh)
+        keep = np.flatnonzero(valid)
+        return [ids[i] for i in keep], kmh[keep], px_per_s[keep]
+
+    def window_step(self, slots, points, timestamp):
+        w = self.window
+        head = self.counts[slots] % w
+        self.positions[slots, head] = points
+        self.times[slots, head] = timestamp
+        self.counts[slots] += 1
+
+        pos = self.positions[slots]            # (n, w, 2)
+        ts = self.times[slots]                 # (n, w)
+        prev_pos = np.roll(pos, 1, axis=1)     # entry i-1 lines up with entry i
+        prev_ts = np.roll(ts, 1, axis=1)
+
+        # Entry i is `age` samples old; a step into i is valid when i-1 is also filled
+        newest = (self.counts[slots] - 1) % w
+        age = (newest[:, None] - np.arange(w)[None, :]) % w
+        filled = np.minimum(self.counts[slots], w)
+        step_ok = age < (filled - 1)[:, None]
+
+        step_px = np.hypot(*(pos - prev_pos).transpose(2, 0, 1))
+        dt = ts - prev_ts
+        step_ok &= (dt > 0) & (step_px > self.min_step_px) & (step_px < self.max_step_px)
+
+        speeds = np.where(step_ok, step_px / np.where(dt > 0, dt, 1.0), 0.0)
+        n_ok = step_ok.sum(axis=1)
+        return speeds.sum(axis=1) / np.maximum(n_ok, 1), n_ok > 0
+
+    def kalman_step(self, slots, points, timestamp):
+        fresh = self.counts[slots] == 0
+        dt = timestamp - self.times[slots, 0]
+        self.times[slots, 0] = timestamp     # the filter only needs the last timestamp
+        self.counts[slots] += 1
+
+        # New tracks start at the measurement with zero velocity and wide uncertainty
+        new = slots[fresh]
+        self.state[new] = 0.0
+        self.state[new, :2] = points[fresh]
+        self.cov[new] = np.diag([self.measurement_noise, self.measurement_noise, 1e4, 1e4])
+
+        old = ~fresh & (dt > 0)
+        s, z, dt = slots[old], points[old], dt[old]
+        if len(s):
+            n = len(s)
+            F = np.tile(np.eye(4), (n, 1, 1))
+            F[:, 0, 2] = dt
+            F[:, 1, 3] = dt
+            # Piecewise white-acceleration process noise
+            q = self.process_noise
+            Q = np.zeros((n, 4, 4))
+            Q[:, [0, 1], [0, 1]] = (q * dt ** 4 / 4)[:, None]
+            Q[:, [2, 3], [2, 3]] = (q * dt ** 2)[:, None]
+            Q[:, [0, 1], [2, 3]] = Q[:, [2, 3], [0, 1]] = (q * dt ** 3 / 2)[:, None]
+
+            # Predict
+            x = np.einsum("nij,nj->ni", F, self.state[s])
+            P = F @ self.cov[s] @ F.transpose(0, 2, 1) + Q
+
+            # Update with the measured position (H = [I 0])
+            S = P[:, :2, :2] + np.eye(2) * self.measurement_noise
+            K = P[:, :, :2] @ np.linalg.inv(S)
+            x = x + np.einsum("nij,nj->ni", K, z - x[:, :2])
+            P = P - K @ P[:, :2, :]
+            self.state[s] = x
+            self.cov[s] = P
+
+        px_per_s = np.hypot(self.state[slots, 2], self.state[slots, 3])
+        return px_per_s, self.counts[slots] > 1
+
+def speed_estimator_for(camera):
+    """Build a SpeedEstimator from a camera config."""
+    return SpeedEstimator(camera["pixels_per_meter"], window=camera["speed_window"],
+                          kalman=camera["speed_kalman"])
+
+if __name__ == "__main__":
+    import cv2
+    import time
+    from detection import get_vehicle_boxes
+    from tracking import CentroidTracker
+    from scheduler import MotionGate, AdaptiveScheduler
+    from models import get_yolo
+
+    # Load YOLOv8 model (Nano for fastest speed)
+    model = get_yolo("yolov8n.pt")
+    tracker = CentroidTracker()
+
+    # Conversion constant (tune based on video)
+    PIXELS_PER_METER = 9.0
+    estimator = SpeedEstimator(PIXELS_PER_METER)
+
+    # Load video
+    cap = cv2.VideoCapture("data/sample_video.mp4")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    print(f"Video FPS: {fps}")
+
+    # Resize for smoother inference
+    resize_width, resize_height = 640, 360
+
+    # Only run YOLO when the scene changes; the tracker coasts in between
+    scheduler = AdaptiveScheduler(MotionGate((resize_width, resize_height)), rules=[])
+
+    # FPS monitoring
+    prev_time = time.time()
+
+    frame_count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        frame = cv2.resize(frame, (resize_width, resize_height))
+        frame_count += 1
+
+        timestamp = frame_count / fps
+
+        if scheduler.should_detect(frame, tracker, timestamp):
+            detections = get_vehicle_boxes(model, frame)
+            current_objects = tracker.update(detections, timestamp)
+            estimator.release(tracker.expired)
+        else:
+            current_objects = tracker.predict(timestamp)
+
+        # Speed Calculation, using the video time of this frame
+        ids, speeds, _ = estimator.update(current_objects, timestamp)
+        speeds = dict(zip(ids, speeds.tolist()))
+
+        for id, pt in current_objects.items():
+            if id in speeds:
+                cv2.putText(frame, f"ID {id} | {int(speeds[id])} km/h",
+                            (pt[0] - 20, pt[1] - 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            else:
+                cv2.putText(frame, f"ID {id}", (pt[0] - 10, pt[1] - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        # FPS display
+        curr_time = time.time()
+        fps_live = 1 / (curr_time - prev_time)
+        prev_time = curr_time
+        cv2.putText(frame, f"FPS: {int(fps_live)}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        cv2.imshow("Smooth Speed Estimation", frame)
+
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
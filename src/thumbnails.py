@@ -0,0 +1,85 @@
+# src/thumbnails.py
+"""Small JPEG previews of evidence images, built once and kept on disk.
+
+A thumbnail's file name is a hash of the source path, its mtime and the
+thumbnail width, so an image that is rewritten gets a fresh preview and
+a stale one is never served. Reading a thumbnail touches its mtime; when
+the cache holds more than `max_files`, the least recently used are deleted.
+"""
+import hashlib
+import os
+import threading
+import cv2
+
+THUMB_DIR = "logs/thumbs"
+
+class ThumbnailCache:
+    """Disk-backed LRU cache of downscaled images."""
+
+    def __init__(self, cache_dir=THUMB_DIR, max_width=240, jpeg_quality=80, max_files=5000):
+        self.cache_dir = cache_dir
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.max_files = max_files
+        os.makedirs(cache_dir, exist_ok=True)
+        self.files = sum(1 for name in os.listdir(cache_dir) if name.endswith(".jpg"))
+        self.lock = threading.Lock()
+
+    def path_for(self, image_path, mtime_ns):
+        key = f"{os.path.abspath(image_path)}|{mtime_ns}|{self.max_width}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".jpg")
+
+    def get(self, image_path):
+        """Path of the thumbnail for `image_path`, building it on first use; None if missing."""
+        if not image_path:
+            return None
+        try:
+            mtime_ns = os.stat(image_path).st_mtime_ns
+        except OSError:
+            return None
+        thumb = self.path_for(image_path, mtime_ns)
+        try:
+            os.utime(thumb)   # mark as recently used
+            return thumb
+        except OSError:
+            pass
+        return thumb if self.build(image_path, thumb) else None
+
+    def build(self, image_path, thumb):
+        image = cv2.imread(image_path)
+        if image is None:
+            return False
+        h, w = image.shape[:2]
+        if w > self.max_width:
+            image = cv2.resize(image, (self.max_width, max(1, int(h * self.max_width / w))),
+                               interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return False
+        tmp = f"{thumb}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data.tobytes())
+        os.replace(tmp, thumb)   # readers never see a half-written file
+        with self.lock:
+            self.files += 1
+            if self.files > self.max_files:
+                self.evict()
+        return True
+
+    def evict(self):
+        """Delete the least recently used thumbnails down to 90% of `max_files`."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".jpg"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        entries.sort()
+        excess = len(entries) - int(self.max_files * 0.9)
+        for _, path in entries[:max(0, excess)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.files = len(entries) - max(0, excess)
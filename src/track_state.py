@@ -0,0 +1,118 @@
+# src/track_state.py
+"""Bounded, time-expiring per-track state for feeds that run for weeks.
+
+Timestamps are the camera's video seconds, so expiry follows the footage
+rather than the wall clock (replays and sped-up files behave the same).
+"""
+from collections import OrderedDict
+import numpy as np
+
+class ExpiringStore:
+    """Dict of key -> value that forgets keys not touched for `ttl` seconds.
+
+    Entries are kept in least-recently-touched order, so expiry only looks at
+    the front, and at most `max_size` are kept (the stalest are evicted).
+    """
+
+    def __init__(self, ttl, max_size=1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()   # key -> (last_touched, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        return default if entry is None else entry[1]
+
+    def pop(self, key, default=None):
+        entry = self.entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def last_touched(self, key):
+        return self.entries[key][0]
+
+    def items(self):
+        """(key, last_touched, value) for every entry, stalest first."""
+        return [(key, t, value) for key, (t, value) in self.entries.items()]
+
+    def touch(self, key, now, value=None):
+        """Set (or refresh) `key`; a None value keeps the old one."""
+        if value is None and key in self.entries:
+            value = self.entries[key][1]
+        self.entries[key] = (now, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def expire(self, now):
+        """Drop every entry last touched more than `ttl` seconds before `now`."""
+        while self.entries:
+            key, (t, _) = next(iter(self.entries.items()))
+            if now - t <= self.ttl:
+                break
+            del self.entries[key]
+
+class ViolationMemory:
+    """Which tracks a rule has already flagged, deduplicated by track and time window.
+
+    A flagged track stays flagged while it is seen and for `window` seconds
+    after. When tracking loses a car and hands it a new ID, the new ID turns
+    up close to where a flagged track was last seen; within `reassign_window`
+    seconds and `reassign_radius` px it inherits the flag instead of being
+    logged again. Memory is capped at `max_size` tracks.
+    """
+
+    def __init__(self, window=30.0, reassign_radius=50.0, reassign_window=2.0, max_size=1000):
+        self.flagged = ExpiringStore(window, max_size)   # id -> last (cx, cy)
+        self.reassign_radius = reassign_radius
+        self.reassign_window = reassign_window
+        self.suppressed = 0   # re-identified vehicles whose repeat violation was dropped
+
+    def __contains__(self, id):
+        return id in self.flagged
+
+    def __len__(self):
+        return len(self.flagged)
+
+    def observe(self, tracks, now):
+        """Follow flagged tracks that are still visible and forget stale ones."""
+        for id, _, _ in self.flagged.items():
+            if id in tracks:
+                self.flagged.touch(id, now, tracks[id])
+        self.flagged.expire(now)
+
+    def lost_nearby(self, point, now, tracks):
+        """A flagged track, no longer visible, last seen near `point` a moment ago."""
+        candidates = [(id, value) for id, t, value in self.flagged.items()
+                      if id not in tracks and value is not None
+                      and now - t <= self.reassign_window]
+        if not candidates or point is None:
+            return None
+        dist = np.hypot(*(np.array([v for _, v in candidates], dtype=np.float64) - point).T)
+        best = int(np.argmin(dist))
+        return candidates[best][0] if dist[best] < self.reassign_radius else None
+
+    def flag(self, id, now, point=None, tracks=()):
+        """True if this is a new violation to log; False for a repeat within the window."""
+        if id in self.flagged:
+            return False
+        repeat = self.lost_nearby(point, now, tracks) is not None
+        self.flagged.touch(id, now, point)
+        if repeat:
+            self.suppressed += 1
+        return not repeat
+
+def violation_memory_for(camera):
+    """Build a ViolationMemory from a camera config's dedup_* settings."""
+    return ViolationMemory(window=camera["dedup_window"],
+                           reassign_radius=camera["dedup_radius"],
+                           reassign_window=camera["dedup_reassign_window"],
+                           max_size=camera["max_tracked"])
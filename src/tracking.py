@@ -1,68 +1,175 @@
-from ultralytics import YOLO
-import cv2
-import math
-
-model = YOLO("yolov8n.pt")
-
-# Classes we care about
-VEHICLE_CLASSES = ["car", "motorbike", "bus", "truck"]
-
-# To store object ID and centroid
-tracked_objects = {}
-object_id = 0  # ✅ define once here
+import numpy as np
 
 def get_center(x1, y1, x2, y2):
     return (int((x1 + x2) / 2), int((y1 + y2) / 2))
 
-cap = cv2.VideoCapture("data/sample_video.mp4")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    results = model(frame, verbose=False)
-    detections = []
-
-    for box in results[0].boxes:
-        cls_id = int(box.cls[0])
-        label = model.names[cls_id]
-        if label in VEHICLE_CLASSES:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            detections.append((x1, y1, x2, y2))
-
-    current_objects = {}
-
-    # Compare new detections to existing tracked ones
-    for (x1, y1, x2, y2) in detections:
-        cx, cy = get_center(x1, y1, x2, y2)
-
-        same_object_detected = False
+class CentroidTracker:
+    """Assign persistent IDs to vehicle boxes by matching centroids frame to frame.
+
+    Every update builds the full detection-to-track distance matrix in NumPy and
+    solves it as one global assignment (Hungarian algorithm), so two detections
+    can never claim the same ID. Tracks that miss a frame are kept alive for
+    `max_age` frames before they are dropped.
+
+    Each track also carries a constant-velocity estimate, so when frames are
+    skipped (see scheduler.py) matching uses where a track should be by now,
+    and predict() can place tracks on frames that were never detected.
+    """
+
+    def __init__(self, max_distance=35, max_age=5, velocity_smoothing=0.5):
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.object_id = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.centroids = np.empty((0, 2), dtype=np.float64)
+        self.track_boxes = np.empty((0, 4), dtype=np.float64)
+        self.misses = np.empty(0, dtype=np.int64)   # frames since last match
+        self.velocities = np.empty((0, 2), dtype=np.float64)   # px per time unit
+        self.last_seen = np.empty(0, dtype=np.float64)
+        self.velocity_smoothing = velocity_smoothing
+        self.clock = 0   # time used when update() is not given a timestamp
+        self.boxes = {}     # id -> (x1, y1, x2, y2) matched in the last frame
+        self.expired = []   # ids dropped by the last update
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predicted_centroids(self, timestamp):
+        """Where every live track should be at `timestamp` under constant velocity."""
+        return self.centroids + self.velocities * (timestamp - self.last_seen)[:, None]
+
+    def predict(self, timestamp):
+        """{id: (cx, cy)} extrapolated to `timestamp` for the tracks seen last update."""
+        active = self.misses == 0
+        points = self.predicted_centroids(timestamp)[active].astype(np.int64)
+        return dict(zip(self.ids[active].tolist(), map(tuple, points.tolist())))
+
+    def match(self, centers, reference=None):
+        """Globally assign detections to tracks; returns (det_idx, track_idx) arrays."""
+        if len(centers) == 0 or len(self.ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if reference is None:
+            reference = self.centroids
+
+        # Squared distances, built per axis to avoid an (N, M, 2) temporary
+        dx = centers[:, 0, None] - reference[None, :, 0]
+        dy = centers[:, 1, None] - reference[None, :, 1]
+        dist2 = dx * dx
+        dist2 += dy * dy
+        admissible = dist2 < self.max_distance ** 2
+
+        # Most vehicles have exactly one candidate and are the only candidate of
+        # that track, so they can be paired directly without the solver.
+        row_counts = np.count_nonzero(admissible, axis=1)
+        col_counts = np.count_nonzero(admissible, axis=0)
+        sole_col = admissible.argmax(axis=1)
+        direct = (row_counts == 1) & (col_counts[sole_col] == 1)
+        det_idx = np.flatnonzero(direct)
+        trk_idx = sole_col[direct]
+
+        # Solve the remaining ambiguous pairs as one global assignment. Pairs
+        # beyond the gate get a prohibitive cost instead of being removed, so
+        # the solver still sees a rectangular matrix.
+        taken = np.zeros(len(self.ids), dtype=bool)
+        taken[trk_idx] = True
+        rows = np.flatnonzero(~direct & (row_counts > 0))
+        cols = np.flatnonzero(~taken & (col_counts > 0))
+        if len(rows) and len(cols):
+            # Imported here: scipy.optimize is slow to import and most frames never need it
+            from scipy.optimize import linear_sum_assignment
+            sub = np.ix_(rows, cols)
+            cost = np.where(admissible[sub], np.sqrt(dist2[sub]), self.max_distance * 1e3)
+            r, c = linear_sum_assignment(cost)
+            keep = admissible[rows[r], cols[c]]
+            det_idx = np.concatenate([det_idx, rows[r][keep]])
+            trk_idx = np.concatenate([trk_idx, cols[c][keep]])
+        return det_idx, trk_idx
+
+    def update(self, detections, timestamp=None):
+        """Match this frame's boxes to known tracks and return {id: (cx, cy)}.
+
+        `timestamp` is the frame's time (e.g. video seconds); without it every
+        update counts as one time step.
+        """
+        self.clock += 1
+        if timestamp is None:
+            timestamp = self.clock
+        dets = np.asarray(detections, dtype=np.float64)
+        dets = dets.reshape(len(dets), -1)[:, :4] if len(dets) else np.empty((0, 4))
+        centers = (dets[:, :2] + dets[:, 2:4]) / 2
+
+        det_idx, trk_idx = self.match(centers, self.predicted_centroids(timestamp))
+
+        # Matched tracks take the new position and velocity; everyone else ages by one frame
+        self.misses += 1
+        self.misses[trk_idx] = 0
+        dt = timestamp - self.last_seen[trk_idx]
+        moving = dt > 0
+        measured = (centers[det_idx] - self.centroids[trk_idx])[moving] / dt[moving, None]
+        a = self.velocity_smoothing
+        self.velocities[trk_idx[moving]] = a * self.velocities[trk_idx[moving]] + (1 - a) * measured
+        self.centroids[trk_idx] = centers[det_idx]
+        self.track_boxes[trk_idx] = dets[det_idx]
+        self.last_seen[trk_idx] = timestamp
+
+        # Unmatched detections start new tracks
+        new = np.ones(len(dets), dtype=bool)
+        new[det_idx] = False
+        n_new = int(new.sum())
+        new_ids = np.arange(self.object_id + 1, self.object_id + 1 + n_new, dtype=np.int64)
+        self.object_id += n_new
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.centroids = np.concatenate([self.centroids, centers[new]])
+        self.track_boxes = np.concatenate([self.track_boxes, dets[new]])
+        self.misses = np.concatenate([self.misses, np.zeros(n_new, dtype=np.int64)])
+        self.velocities = np.concatenate([self.velocities, np.zeros((n_new, 2))])
+        self.last_seen = np.concatenate([self.last_seen, np.full(n_new, float(timestamp))])
+
+        # Drop tracks that have been lost for too long
+        alive = self.misses <= self.max_age
+        self.expired = self.ids[~alive].tolist()
+        self.ids = self.ids[alive]
+        self.centroids = self.centroids[alive]
+        self.track_boxes = self.track_boxes[alive]
+        self.misses = self.misses[alive]
+        self.velocities = self.velocities[alive]
+        self.last_seen = self.last_seen[alive]
+
+        # Report only the tracks seen in this frame
+        active = self.misses == 0
+        ids = self.ids[active].tolist()
+        boxes = self.track_boxes[active].astype(np.int64)
+        centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).astype(np.int64)
+        self.boxes = dict(zip(ids, map(tuple, boxes.tolist())))
+        return dict(zip(ids, map(tuple, centers.tolist())))
+
+if __name__ == "__main__":
+    import cv2
+    from detection import get_vehicle_boxes
+    from models import get_yolo
+
+    model = get_yolo("yolov8n.pt")
+    tracker = CentroidTracker()
+    cap = cv2.VideoCapture("data/sample_video.mp4")
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        detections = get_vehicle_boxes(model, frame)
+        tracked_objects = tracker.update(detections)
+
+        # Draw boxes + IDs
         for id, pt in tracked_objects.items():
-            dist = math.hypot(cx - pt[0], cy - pt[1])
-            if dist < 35:  # Threshold for same object
-                current_objects[id] = (cx, cy)
-                same_object_detected = True
-                break
-
-        if not same_object_detected:
-            # ❌ Don't use 'global' here — just increment normally
-            object_id += 1
-            current_objects[object_id] = (cx, cy)
-
-    # Update tracked objects
-    tracked_objects = current_objects.copy()
-
-    # Draw boxes + IDs
-    for id, pt in tracked_objects.items():
-        cv2.circle(frame, pt, 4, (0, 255, 0), -1)
-        cv2.putText(frame, f"ID {id}", (pt[0] - 10, pt[1] - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.circle(frame, pt, 4, (0, 255, 0), -1)
+            cv2.putText(frame, f"ID {id}", (pt[0] - 10, pt[1] - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
-    cv2.imshow("Vehicle Tracking", frame)
+        cv2.imshow("Vehicle Tracking", frame)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
 
-cap.release()
-cv2.destroyAllWindows()
+    cap.release()
+    cv2.destroyAllWindows()
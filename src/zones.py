@@ -0,0 +1,121 @@
+# src/zones.py
+"""Stop lines and lanes of one camera, set up once so per-frame checks are array ops.
+
+A camera config may list
+
+    "stop_lines": [{"points": [[x1, y1], [x2, y2]], "direction": [dx, dy]}, ...]
+    "lanes": [{"name": "north", "polygon": [[x, y], ...], "direction": [dx, dy]}, ...]
+
+Stop lines are segments; `direction` (optional) is the way traffic moves
+when it crosses one, so vehicles driving away from the junction on the
+other side are not flagged. Without stop_lines the camera gets a single
+horizontal line across the frame at stop_line_y.
+
+Lanes are rasterized into a label mask (0 = no lane, i + 1 = lane i) when
+the zones are built, so finding the lane of every track is one array index.
+Where lane polygons overlap, the later one wins.
+
+A track crosses a stop line when the segment from its previous to its
+current position intersects it. That holds however far the vehicle moved
+in between, so frames skipped by the scheduler or dropped by a live source
+can't let a vehicle jump over the line.
+"""
+import cv2
+import numpy as np
+
+def cross(u, v):
+    """z of the 2-D cross product, broadcast over leading axes."""
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+def unit(vectors):
+    """Rows scaled to length 1; zero rows (no direction) stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 2)
+    norm = np.hypot(vectors[:, 0], vectors[:, 1])
+    return np.divide(vectors, norm[:, None], out=np.zeros_like(vectors), where=norm[:, None] > 0)
+
+class ZoneMap:
+    """A camera's stop-line segments and lane label mask."""
+
+    def __init__(self, frame_size, stop_lines=(), lanes=()):
+        w, h = frame_size
+        self.frame_size = (w, h)
+
+        # --- Stop lines: (S, 2, 2) endpoints, (S, 2) crossing directions ---
+        self.segments = np.array([line["points"] for line in stop_lines],
+                                 dtype=np.float64).reshape(-1, 2, 2)
+        self.directions = unit([line.get("direction") or (0, 0) for line in stop_lines])
+
+        # --- Lanes: label mask, plus one direction row per label ---
+        self.lanes = [dict(lane, name=lane.get("name", f"lane{i}")) for i, lane in enumerate(lanes)]
+        self.labels = None
+        self.lane_directions = np.zeros((len(self.lanes) + 1, 2))
+        if self.lanes:
+            if len(self.lanes) > 255:
+                raise ValueError("at most 255 lanes per camera")
+            self.labels = np.zeros((h, w), dtype=np.uint8)
+            for i, lane in enumerate(self.lanes):
+                polygon = np.round(np.asarray(lane["polygon"], dtype=np.float64)).astype(np.int32)
+                cv2.fillPoly(self.labels, [polygon], i + 1)
+            self.lane_directions[1:] = unit([lane["direction"] for lane in self.lanes])
+
+    def lane_at(self, points):
+        """Lane label (0 = none) of every (N, 2) point."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.labels is None:
+            return np.zeros(len(points), dtype=np.int64)
+        w, h = self.frame_size
+        x = np.floor(points[:, 0]).astype(np.int64)
+        y = np.floor(points[:, 1]).astype(np.int64)
+        inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+        labels = self.labels[np.clip(y, 0, h - 1), np.clip(x, 0, w - 1)].astype(np.int64)
+        return np.where(inside, labels, 0)
+
+    def crossings(self, start, end):
+        """(N, S) bool: does the move start[i] → end[i] cross stop line j?
+
+        A move that starts exactly on a line doesn't cross it again (the
+        move that reached the line already did), and a line with a
+        direction is only crossed by moves that go its way.
+        """
+        start = np.asarray(start, dtype=np.float64).reshape(-1, 1, 2)
+        end = np.asarray(end, dtype=np.float64).reshape(-1, 1, 2)
+        a, b = self.segments[None, :, 0], self.segments[None, :, 1]
+        move, line = end - start, b - a
+        d_start = cross(line, start - a)   # which side of the line each end of the move is on
+        d_end = cross(line, end - a)
+        d_a = cross(move, a - start)       # which side of the move each end of the line is on
+        d_b = cross(move, b - start)
+        hit = (d_start != 0) & (d_start * d_end <= 0) & (d_a * d_b <= 0)
+        heading = (move * self.directions[None]).sum(axis=2)
+        undirected = ~self.directions.any(axis=1)
+        return hit & (undirected[None] | (heading > 0))
+
+    def distance_to_lines(self, points):
+        """Distance from every (N, 2) point to its nearest stop line (inf with none)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        if not len(self.segments):
+            return np.full(len(points), np.inf)
+        a, line = self.segments[None, :, 0], self.segments[None, :, 1] - self.segments[None, :, 0]
+        length2 = np.maximum((line * line).sum(axis=2), 1e-12)
+        t = np.clip(((points - a) * line).sum(axis=2) / length2, 0.0, 1.0)
+        nearest = a + t[..., None] * line
+        return np.hypot(*(points - nearest).transpose(2, 0, 1)).min(axis=1)
+
+    def lines_rect(self, margin):
+        """Bounding (x1, y1, x2, y2) of the stop lines, padded by `margin`."""
+        points = self.segments.reshape(-1, 2)
+        return (*(points.min(axis=0) - margin), *(points.max(axis=0) + margin))
+
+    def lanes_rect(self, margin):
+        """Bounding (x1, y1, x2, y2) of the lanes, padded by `margin`."""
+        points = np.concatenate([np.asarray(lane["polygon"], dtype=np.float64) for lane in self.lanes])
+        return (*(points.min(axis=0) - margin), *(points.max(axis=0) + margin))
+
+def zones_for(camera):
+    """Build a camera's ZoneMap, defaulting to one stop line across the frame at stop_line_y."""
+    w, h = camera["frame_size"]
+    stop_lines = camera.get("stop_lines")
+    if stop_lines is None:
+        y = camera["stop_line_y"]
+        stop_lines = [{"points": [[0, y], [w, y]]}]
+    return ZoneMap((w, h), stop_lines, camera.get("lanes") or ())
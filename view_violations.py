@@ -1,30 +1,73 @@
-import sqlite3
-from tabulate import tabulate
+import argparse
 import os
+import sys
+from datetime import datetime
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from queries import connect_readonly, list_violations  # noqa: E402
 
 DB_PATH = "logs/violations.db"
 
-def view_violations():
-    """Display all violations in a clean table format."""
+# Pretty column headers; columns not listed here are shown by their DB name
+HEADERS = {
+    "id": "ID",
+    "vehicle_id": "Vehicle ID",
+    "type": "Type",
+    "timestamp": "Timestamp",
+    "image_path": "Image Path",
+    "camera": "Camera",
+    "crop_path": "Crop Path",
+    "event_id": "Event ID",
+    "plate_text": "Plate",
+    "plate_conf": "Plate Conf",
+    "clip_path": "Clip Path",
+}
+
+def view_violations(limit=50, before_id=None, violation_type=None, camera=None,
+                    vehicle_id=None, since=None, until=None):
+    """Display one page of violations, newest first, in a clean table format."""
     if not os.path.exists(DB_PATH):
         print("⚠️  No database found. Run the detection script first.")
         return
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM violations")
-    rows = cursor.fetchall()
-    conn.close()
+    conn = connect_readonly(DB_PATH)
+    try:
+        rows, next_before_id = list_violations(conn, limit, before_id,
+                                               violation_type=violation_type, camera=camera,
+                                               vehicle_id=vehicle_id, since=since, until=until)
+    finally:
+        conn.close()
 
     if rows:
         print(tabulate(
-            rows,
-            headers=["ID", "Vehicle ID", "Type", "Timestamp", "Image Path"],
+            [list(row.values()) for row in rows],
+            headers=[HEADERS.get(column, column) for column in rows[0]],
             tablefmt="grid"
         ))
+        if next_before_id is not None:
+            print(f"➡️  Next page: --before-id {next_before_id}")
     else:
-        print("✅ No violations recorded yet.")
+        print("✅ No violations recorded yet." if before_id is None and since is None
+              else "✅ No matching violations.")
+
+def db_time(value):
+    """argparse type: ISO date/time → the DB's timestamp format."""
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date/time: {value!r}")
 
 if __name__ == "__main__":
-    view_violations()
+    parser = argparse.ArgumentParser(description="Page through logged violations")
+    parser.add_argument("--limit", type=int, default=50, help="rows per page")
+    parser.add_argument("--before-id", type=int, default=None,
+                        help="show rows older than this id (the next-page cursor)")
+    parser.add_argument("--type", default=None, help='e.g. "Red Light"')
+    parser.add_argument("--camera", default=None)
+    parser.add_argument("--vehicle", type=int, default=None, help="vehicle (track) id")
+    parser.add_argument("--since", type=db_time, default=None, help="e.g. 2026-10-01 or 2026-10-01T08:00")
+    parser.add_argument("--until", type=db_time, default=None, help="exclusive end time")
+    args = parser.parse_args()
+    view_violations(args.limit, args.before_id, args.type, args.camera, args.vehicle,
+                    args.since, args.until)